@@ -0,0 +1,62 @@
+import pandas as pd
+
+import pipeline
+from result_cache import RESULT_CACHE, cached
+
+# مراحل pipeline مغلفة بذاكرة النتائج: اللوحة وواجهة JSON تستدعيان الدوال نفسها بالمفاتيح نفسها،
+# فما يحسبه أحدهما في العملية يخدم الآخر. المعاملات التي تبدأ بـ "_" لا تدخل في المفتاح
+
+
+def refresh(backend):
+    # عرض البيانات الحالية؛ وعند تغيّر التوقيع تُحذف النتائج المحفوظة للنسخ السابقة
+    view = backend.refresh()
+    RESULT_CACHE.retain(view.signature)
+    return view
+
+
+def filter_key(view, products, regions, start, end):
+    # مفتاح موحّد لحالة الفلاتر تُحفظ عليه النتائج في الذاكرة المشتركة بين الجلسات
+    return (view.signature, tuple(sorted(products)), tuple(sorted(regions)), pd.Timestamp(start), pd.Timestamp(end))
+
+
+@cached("filters")
+def selection(filter_key, _view):
+    _, products, regions, start_date, end_date = filter_key
+    return pipeline.filter_rows(_view, products, regions, start_date, end_date)
+
+
+@cached("kpis")
+def kpis(filter_key, _selection):
+    return pipeline.kpis(_selection)
+
+
+# المجاميع التراكمية للمنتجات والمناطق المختارة (لا تعتمد على الفترة)
+@cached("timeline")
+def timeline(signature, products, regions, _view):
+    return pipeline.period_timeline(_view, products, regions)
+
+
+@cached("period_kpis")
+def period_kpis(filter_key, _view):
+    signature, products, regions, _, end_date = filter_key
+    return pipeline.period_kpis(timeline(signature, products, regions, _view), end_date)
+
+
+# التسميات تُشتق من مؤشرات الفلتر نفسه فلا تدخل في المفتاح؛ في محركات SQL الترتيب استعلام على الصفوف المفلترة
+@cached("appearance_order")
+def appearance_order(filter_key, dimension, _labels, _selection):
+    return _selection.appearance_order(_labels, dimension)
+
+
+@cached("breakdown")
+def breakdown(filter_key, dims, _selection):
+    # الإيرادات حسب أبعاد مختارة، وأيام الأسبوع بترتيب الأسبوع
+    return _selection.sum_by(*dims, week_order=True)
+
+
+@cached("day_impact_frame")
+def day_impact(filter_key, selected_product, selected_region, _view):
+    # (الإيرادات حسب يوم الأسبوع للمنتج والمنطقة ضمن فترة الفلتر، الإحصائيات أو None)
+    _, _, _, start_date, end_date = filter_key
+    analysis_df = pipeline.day_impact_frame(_view, selected_product, selected_region, start_date, end_date)
+    return analysis_df, pipeline.day_impact_stats(analysis_df)
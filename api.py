@@ -0,0 +1,326 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import pipeline
+from backends import DASHBOARD_BACKEND, shared_backend
+from export import EXPORT_FORMATS, available_formats, write_export
+from profiling import METRICS, stage
+
+# واجهة JSON لمؤشرات اللوحة وتفصيلاتها دون Streamlit، بالفلاتر نفسها (product و region مكررة،
+# start و end بصيغة YYYY-MM-DD؛ الافتراضي كل القيم وكامل الفترة) وذاكرة النتائج نفسها:
+#
+#     python api.py --port 8600
+#     curl -G localhost:8600/kpis --data-urlencode "product=منتج A" --data-urlencode "region=جدة" \
+#         -d start=2024-01-01 -d end=2024-03-31
+#     curl -G localhost:8600/breakdown -d by=product,weekday
+#     curl -G localhost:8600/day-impact --data-urlencode "selected_product=منتج A" \
+#         --data-urlencode "selected_region=جدة"
+#     curl -G localhost:8600/export -d format=gzip --data-urlencode "region=جدة" -o sales.csv.gz
+#
+# القيم العربية والمسافات تُرمَّز في الرابط (--data-urlencode)؛ curl لا يرمّزها إن كُتبت فيه مباشرة
+#
+# مع "python warmup.py --serve --api-port 8600" تعمل في عملية اللوحة فتتشارك البيانات والنتائج المحفوظة
+
+DATA_PATH = "Dataset.csv"
+CACHE_DIR = ".dataset_cache"
+API_PORT = int(os.environ.get("DASHBOARD_API_PORT", "8600"))
+# عدد الخيوط التي تعالج الطلبات؛ الطلبات الزائدة تنتظر في الطابور
+API_WORKERS = int(os.environ.get("DASHBOARD_API_WORKERS", "8"))
+# الردود الأكبر من هذا الحجم تُضغط بـ gzip إن قبلها العميل
+GZIP_MIN_BYTES = 1024
+
+# أسماء الأبعاد في الطلبات والردود وأعمدتها في البيانات
+DIMENSIONS = {"product": "المنتج", "region": "المنطقة", "weekday": "يوم_الأسبوع", "date": "التاريخ"}
+
+# صيغ /export في الطلبات وأسماؤها في export.py
+EXPORT_NAMES = {"csv": "CSV", "gzip": "CSV مضغوط (gzip)", "parquet": "Parquet"}
+
+LOGGER = logging.getLogger("dashboard.api")
+
+
+class DashboardAPI:
+    # يحوّل المسار ومعاملات الطلب إلى (الحالة، نوع المحتوى، البايتات)؛ مستقل عن خادم HTTP
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.routes = {
+            "/kpis": self.kpis,
+            "/breakdown": self.breakdown,
+            "/day-impact": self.day_impact,
+            "/filters": self.filters,
+            "/health": self.health,
+        }
+
+    def respond(self, path, params):
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", METRICS.prometheus().encode()
+        if path == "/export":
+            try:
+                return self.export(aggregates.refresh(self.backend), params)
+            except ValueError as error:
+                return _json(400, {"error": str(error)})
+        route = self.routes.get(path)
+        if route is None:
+            return _json(404, {"error": f"مسار غير معروف: {path}"})
+        with stage(f"api:{path}") as record:
+            try:
+                # فحص رخيص لتوقيع الملف كما في كل إعادة تشغيل للوحة
+                status, content_type, body = _json(200, route(aggregates.refresh(self.backend), params))
+            except ValueError as error:
+                status, content_type, body = _json(400, {"error": str(error)})
+            record["bytes"] = len(body)
+        return status, content_type, body
+
+    def kpis(self, view, params):
+        key = _filter_key(view, params)
+        selection = aggregates.selection(key, view)
+        total_revenue, by_day, by_product, by_region = aggregates.kpis(key, selection)
+        top_day, _ = pipeline.extremes(by_day)
+        top_product, low_product = pipeline.extremes(by_product)
+        top_region, low_region = pipeline.extremes(by_region)
+        moving_average, week_change, month_change, cumulative_revenue = aggregates.period_kpis(key, view)
+        return {
+            "filters": _filters(key),
+            "rows": len(selection),
+            "total": total_revenue,
+            "top_day": _named(top_day),
+            "top_product": _named(top_product),
+            "low_product": _named(low_product),
+            "top_region": _named(top_region),
+            "low_region": _named(low_region),
+            "moving_average_7d": moving_average,
+            "week": {"revenue": week_change[0], "change_pct": week_change[1]},
+            "month": {"revenue": month_change[0], "change_pct": month_change[1]},
+            "cumulative": cumulative_revenue,
+        }
+
+    def breakdown(self, view, params):
+        # الإيرادات حسب بُعد أو أكثر كما في تبويبات المقارنة، كأعمدة وصفوف دون تكرار الأسماء
+        names = [name for value in params.get("by", ["product"]) for name in value.split(",") if name]
+        unknown = [name for name in names if name not in DIMENSIONS]
+        if unknown or not names or len(set(names)) != len(names):
+            raise ValueError(f"أبعاد غير صالحة: {','.join(names)} (المتاح: {','.join(DIMENSIONS)})")
+        key = _filter_key(view, params)
+        series = aggregates.breakdown(key, tuple(DIMENSIONS[name] for name in names), aggregates.selection(key, view))
+        return {"filters": _filters(key), "columns": names + ["revenue"], "rows": _rows(series.reset_index())}
+
+    def day_impact(self, view, params):
+        # الإيرادات حسب يوم الأسبوع لمنتج واحد في منطقة واحدة ضمن فترة الفلتر؛ الاختيار منفصل عن فلاتر
+        # product و region كما في قسم التحليل في اللوحة، فيُحفظ بالمفتاح نفسه
+        products, regions, _, _ = pipeline.default_filters(view)
+        selected_product = _single(params, "selected_product", products)
+        selected_region = _single(params, "selected_region", regions)
+        key = _filter_key(view, params)
+        analysis_df, impact_stats = aggregates.day_impact(key, selected_product, selected_region, view)
+        result = {"filters": _filters(key), "columns": ["weekday", "revenue"], "rows": _rows(analysis_df)}
+        if impact_stats is None:
+            return dict(result, avg_sales=None)
+        avg_sales, max_day, min_day, max_percentage, min_percentage = impact_stats
+        return dict(
+            result,
+            avg_sales=avg_sales,
+            max_day=_named((max_day["يوم_الأسبوع"], max_day["الإيرادات"])),
+            max_percentage=max_percentage,
+            min_day=_named((min_day["يوم_الأسبوع"], min_day["الإيرادات"])),
+            min_percentage=min_percentage,
+        )
+
+    def filters(self, view, params):
+        # القيم المتاحة للفلاتر كما تظهر في اللوحة
+        products, regions, start_date, end_date = pipeline.default_filters(view)
+        return {"products": list(products), "regions": list(regions), "start": _date(start_date), "end": _date(end_date)}
+
+    def health(self, view, params):
+        return {"status": "ok", "signature": str(view.signature)}
+
+    def export(self, view, params):
+        # الصفوف المفلترة كملف يُكتب إلى الاتصال جزءًا بجزء، فلا يبقى كاملًا في الذاكرة ولا على القرص؛
+        # بديل زر التحميل في اللوحة للملفات الكبيرة، إذ يقرأ Streamlit الملف كله في الذاكرة قبل إرساله
+        names = [name for name in EXPORT_NAMES if EXPORT_NAMES[name] in available_formats()]
+        name = _single(params, "format", names) if "format" in params else "csv"
+        export_format = EXPORT_NAMES[name]
+        key = _filter_key(view, params)
+        selection = aggregates.selection(key, view)
+
+        def write(handle):
+            with stage("api:/export") as record:
+                write_export(selection, export_format, handle)
+                record["rows"] = len(selection)
+
+        return 200, EXPORT_FORMATS[export_format][1], write
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "DashboardAPI"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, content_type, body = self.server.api.respond(url.path, parse_qs(url.query))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if callable(body):
+            # ملف التحميل: يُرسل أثناء كتابته دون طول مسبق، ونهايته إغلاق الاتصال (HTTP/1.0)
+            self.send_header("Content-Disposition", f'attachment; filename="sales{_suffix(content_type)}"')
+            self.end_headers()
+            body(self.wfile)
+            return
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+
+class PooledHTTPServer(HTTPServer):
+    # كل طلب يُعالج في مجموعة خيوط ثابتة الحجم بدل خيط جديد لكل اتصال؛ الاستعلامات على المحرك
+    # وذاكرة النتائج آمنة بين الخيوط، فتتوزع الطلبات المتزامنة على الخيوط وتتشارك ما حُسب
+
+    def __init__(self, address, api, workers=API_WORKERS):
+        super().__init__(address, APIRequestHandler)
+        self.api = api
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="dashboard-api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_server(host="127.0.0.1", port=API_PORT, workers=API_WORKERS, path=DATA_PATH, cache_dir=CACHE_DIR,
+                backend=DASHBOARD_BACKEND):
+    return PooledHTTPServer((host, port), DashboardAPI(shared_backend(path, cache_dir, backend)), workers)
+
+
+def _filter_key(view, params):
+    products, regions, start_date, end_date = pipeline.default_filters(view)
+    products = _choices(params, "product", products)
+    regions = _choices(params, "region", regions)
+    start_date = _timestamp(params, "start", start_date)
+    end_date = _timestamp(params, "end", end_date)
+    if start_date > end_date:
+        raise ValueError(f"بداية الفترة {_date(start_date)} بعد نهايتها {_date(end_date)}")
+    return aggregates.filter_key(view, products, regions, start_date, end_date)
+
+
+def _choices(params, name, available):
+    # القيم المكررة أو المفصولة بفواصل؛ بدونها كل القيم كالفلتر الافتراضي في اللوحة
+    values = [value for raw in params.get(name, ()) for value in raw.split(",") if value]
+    if not values:
+        return list(available)
+    unknown = sorted(set(values) - set(available))
+    if unknown:
+        raise ValueError(f"قيم غير معروفة لـ {name}: {','.join(unknown)}")
+    return values
+
+
+def _single(params, name, available):
+    values = params.get(name, ())
+    if len(values) != 1 or not values[0]:
+        raise ValueError(f"المعامل {name} مطلوب بقيمة واحدة")
+    if values[0] not in set(available):
+        raise ValueError(f"قيمة غير معروفة لـ {name}: {values[0]}")
+    return values[0]
+
+
+def _timestamp(params, name, default):
+    # أيام كاملة كما يعيدها منتقي التاريخ في اللوحة، فتتطابق مفاتيح النتائج المحفوظة
+    values = params.get(name)
+    if not values:
+        return pd.Timestamp(default).floor("D")
+    try:
+        return pd.Timestamp(values[0]).floor("D")
+    except ValueError:
+        raise ValueError(f"تاريخ غير صالح في {name}: {values[0]} (الصيغة YYYY-MM-DD)") from None
+
+
+def _suffix(content_type):
+    return next(suffix for suffix, mime in EXPORT_FORMATS.values() if mime == content_type)
+
+
+def _filters(filter_key):
+    _, products, regions, start_date, end_date = filter_key
+    return {"products": list(products), "regions": list(regions), "start": _date(start_date), "end": _date(end_date)}
+
+
+def _named(named):
+    return None if named is None else {"name": named[0], "revenue": named[1]}
+
+
+def _date(timestamp):
+    return None if pd.isna(timestamp) else timestamp.strftime("%Y-%m-%d")
+
+
+def _rows(frame):
+    # صفوف كقوائم قيم؛ التواريخ بصيغة YYYY-MM-DD وأيام الأسبوع بأسمائها
+    columns = []
+    for _, column in frame.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime("%Y-%m-%d")
+        columns.append(column.tolist())
+    return [list(row) for row in zip(*columns)]
+
+
+def _json(status, payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+    return status, "application/json; charset=utf-8", body
+
+
+def _default(value):
+    # القيم العددية من numpy (المجاميع بأنواع صحيحة مصغرة)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, pd.Timestamp):
+        return _date(value)
+    raise TypeError(f"قيمة غير قابلة للتحويل إلى JSON: {type(value).__name__}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="واجهة JSON لمؤشرات لوحة المبيعات")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--backend", default=DASHBOARD_BACKEND)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.data, args.cache_dir, args.backend)
+    print(f"واجهة JSON على http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,48 @@
+import json
+from functools import partial
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+import aggregates
+from backends import shared_backend
+from downsample import ROLLUPS
+from export import EXPORT_FORMATS, available_formats
+from figure_budget import FIGURE_BUDGET_STRICT, FigureBudgetExceeded, check_figure, sized
+import pipeline
+from profiling import DASHBOARD_DEBUG, METRICS, profiled, stage, start_rerun
+from result_cache import RESULT_CACHE, cached
+from table import PAGE_SIZES, SORT_COLUMNS, page_count
+from timeline import MOVING_PERIODS, OVERLAYS, PERIOD_KPIS
 
 # تخصيص الألوان والأنماط
 PRIMARY_COLOR = "#1E90FF"  # أزرق متوسط
 BACKGROUND_COLOR = "#F0F8FF"  # أزرق فاتح كخلفية
 TEXT_COLOR = "#333333"  # لون نص داكن
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("Dataset.csv")
-    df["المنتج"] = df["المنتج"].astype(str)
-    df["المنطقة"] = df["المنطقة"].astype(str)
-    df["التاريخ"] = pd.to_datetime(df["التاريخ"])
-    days_map = {
-        'Monday': 'الإثنين',
-        'Tuesday': 'الثلاثاء',
-        'Wednesday': 'الأربعاء',
-        'Thursday': 'الخميس',
-        'Friday': 'الجمعة',
-        'Saturday': 'السبت',
-        'Sunday': 'الأحد'
-    }
-    df['يوم_الأسبوع'] = df['التاريخ'].dt.day_name().map(days_map)
-    return df
-
-df = load_data()
+DATA_PATH = "Dataset.csv"
+CACHE_DIR = ".dataset_cache"
+
+# قياس زمن كل مرحلة في إعادة التشغيل الحالية (تُعرض في لوحة الأداء عند ?debug=1)
+profile = start_rerun()
+
+# تشغيل السكربت دون خادم (التسخين في warmup.py): تُبنى كل الأقسام والتبويبات المغلقة
+# حتى تُحفظ نتائجها في ذاكرة النتائج قبل أول زائر
+PRELOAD = not st.runtime.exists()
+
+def plot_chart(figure, name):
+    # التحقق من حجم الرسم قبل إرساله للمتصفح؛ figure هو (الرسم، حجمه) كما تعيده دوال الرسم المحفوظة
+    fig, size = figure
+    with stage(f"chart:{name}") as record:
+        try:
+            record["bytes"] = check_figure(size, name)
+        except FigureBudgetExceeded as exc:
+            record["bytes"] = exc.size
+            if FIGURE_BUDGET_STRICT:
+                st.error(str(exc))
+                return
+            st.warning(str(exc))
+        st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
 
 # تهيئة الصفحة مع خلفية مخصصة
 st.set_page_config(
@@ -62,84 +79,97 @@ st.markdown("> منصة تفاعلية لتحليل أداء المنتجات و
 
 st.divider()
 
+# العنوان يظهر قبل تحميل البيانات. cache_resource: البيانات مشتركة للقراءة فقط، فلا داعي لنسخها في كل إعادة تشغيل.
+# المحرك يُختار عبر DASHBOARD_BACKEND: pandas في الذاكرة، أو sqlite/duckdb لبيانات أكبر من الذاكرة
+@st.cache_resource
+def load_data():
+    return shared_backend(DATA_PATH, CACHE_DIR)
+
+# عند إلحاق صفوف بملف CSV تُقرأ الإضافة فقط؛ ويُعاد تحليل الملف كاملًا إن تغيّر ما قبلها
+with stage("load_data"):
+    data = aggregates.refresh(load_data())
+data_signature = data.signature
+
 # فلاتر بتصميم محسّن
 col1, col2 = st.columns(2)
 with col1:
     st.markdown('<div class="stHeader">اختر المنتج:</div>', unsafe_allow_html=True)
-    product_filter = st.multiselect("", df["المنتج"].unique(), default=df["المنتج"].unique(), key="product_filter")
+    product_options = data.products()
+    product_filter = st.multiselect("", product_options, default=product_options, key="product_filter")
 
 with col2:
     st.markdown('<div class="stHeader">اختر المنطقة:</div>', unsafe_allow_html=True)
-    region_filter = st.multiselect("", df["المنطقة"].unique(), default=df["المنطقة"].unique(), key="region_filter")
+    region_options = data.regions()
+    region_filter = st.multiselect("", region_options, default=region_options, key="region_filter")
 
-min_date, max_date = df["التاريخ"].min(), df["التاريخ"].max()
+min_date, max_date = data.date_range()
 date_col = st.columns(1)
 with date_col[0]:
     st.markdown('<div class="stHeader">الفترة الزمنية:</div>', unsafe_allow_html=True)
     date_filter = st.date_input("", value=(min_date, max_date), min_value=min_date, max_value=max_date, key="date_filter")
 
-filtered_df = df[
-    (df["المنتج"].isin(product_filter)) &
-    (df["المنطقة"].isin(region_filter)) &
-    (df["التاريخ"] >= pd.to_datetime(date_filter[0])) &
-    (df["التاريخ"] <= pd.to_datetime(date_filter[1]))
-]
+start_date, end_date = pd.to_datetime(date_filter[0]), pd.to_datetime(date_filter[1])
+# التجميعات المحفوظة مشتركة مع واجهة JSON (api.py) عبر aggregates
+filter_key = aggregates.filter_key(data, product_filter, region_filter, start_date, end_date)
+
+with stage("filters") as record:
+    selection = aggregates.selection(filter_key, data)
+    record["rows"] = len(selection)
+with stage("kpis"):
+    total_revenue, top_day_series, product_series, region_series = aggregates.kpis(filter_key, selection)
+top_day, _ = pipeline.extremes(top_day_series)
+top_product, low_product = pipeline.extremes(product_series)
+top_region, low_region = pipeline.extremes(region_series)
 
 st.divider()
 
 st.subheader("📌 لمحة سريعة")
 st.caption("نظرة عامة على الأداء الرئيسي بناءً على الفلاتر المختارة")
 
+def named_metric(label, named):
+    # (الاسم، القيمة) من pipeline.extremes، أو "-" عند عدم وجود بيانات
+    st.metric(label, "-" if named is None else f"{named[0]} ({named[1]:,.0f})")
+
 kpi_row1 = st.columns(3)
 with kpi_row1[0]:
-    st.metric("إجمالي الإيرادات", f"{filtered_df['الإيرادات'].sum():,.0f}")
+    st.metric("إجمالي الإيرادات", f"{total_revenue:,.0f}")
 with kpi_row1[1]:
-    top_day_series = filtered_df.groupby("يوم_الأسبوع")["الإيرادات"].sum()
-    if not top_day_series.empty:
-        top_day_name = top_day_series.idxmax()
-        top_day_value = top_day_series.max()
-        st.metric("اليوم الأعلى مبيعًا", f"{top_day_name} ({top_day_value:,.0f})")
-    else:
-        st.metric("اليوم الأعلى مبيعًا", "-")
+    named_metric("اليوم الأعلى مبيعًا", top_day)
 with kpi_row1[2]:
-    top_product_series = filtered_df.groupby("المنتج")["الإيرادات"].sum()
-    if not top_product_series.empty:
-        top_prod_name = top_product_series.idxmax()
-        top_prod_value = top_product_series.max()
-        st.metric("المنتج الأعلى مبيعًا", f"{top_prod_name} ({top_prod_value:,.0f})")
-    else:
-        st.metric("المنتج الأعلى مبيعًا", "-")
+    named_metric("المنتج الأعلى مبيعًا", top_product)
 
 kpi_row2 = st.columns(3)
 with kpi_row2[0]:
-    low_product_series = filtered_df.groupby("المنتج")["الإيرادات"].sum()
-    if not low_product_series.empty:
-        low_prod_name = low_product_series.idxmin()
-        low_prod_value = low_product_series.min()
-        st.metric("المنتج الأقل مبيعًا", f"{low_prod_name} ({low_prod_value:,.0f})")
-    else:
-        st.metric("المنتج الأقل مبيعًا", "-")
+    named_metric("المنتج الأقل مبيعًا", low_product)
 with kpi_row2[1]:
-    top_region_series = filtered_df.groupby("المنطقة")["الإيرادات"].sum()
-    if not top_region_series.empty:
-        top_region_name = top_region_series.idxmax()
-        top_region_value = top_region_series.max()
-        st.metric("المنطقة الأعلى إيرادًا", f"{top_region_name} ({top_region_value:,.0f})")
-    else:
-        st.metric("المنطقة الأعلى إيرادًا", "-")
+    named_metric("المنطقة الأعلى إيرادًا", top_region)
 with kpi_row2[2]:
-    low_region_series = filtered_df.groupby("المنطقة")["الإيرادات"].sum()
-    if not low_region_series.empty:
-        low_region_name = low_region_series.idxmin()
-        low_region_value = low_region_series.min()
-        st.metric("المنطقة الأقل مبيعًا", f"{low_region_name} ({low_region_value:,.0f})")
-    else:
-        st.metric("المنطقة الأقل مبيعًا", "-")
+    named_metric("المنطقة الأقل مبيعًا", low_region)
+
+# مؤشرات الفترة حتى نهاية الفترة المختارة، من المجاميع التراكمية اليومية
+period_choice = st.multiselect("مؤشرات الفترة:", PERIOD_KPIS, default=list(PERIOD_KPIS), key="period_kpis")
+if period_choice:
+    with stage("period_kpis"):
+        moving_average, week_change, month_change, cumulative_revenue = aggregates.period_kpis(filter_key, data)
+    period_metrics = {
+        "المتوسط اليومي (7 أيام)": (f"{moving_average:,.0f}", None, "متوسط الإيرادات اليومية في آخر 7 أيام من الفترة"),
+        "التغير الأسبوعي": (
+            f"{week_change[0]:,.0f}", None if week_change[1] is None else f"{week_change[1]:+.1f}%",
+            "إيرادات آخر 7 أيام مقارنة بالأيام السبعة التي قبلها"
+        ),
+        "التغير الشهري": (
+            f"{month_change[0]:,.0f}", None if month_change[1] is None else f"{month_change[1]:+.1f}%",
+            "إيرادات آخر 30 يومًا مقارنة بالثلاثين يومًا التي قبلها"
+        ),
+        "الإجمالي التراكمي": (f"{cumulative_revenue:,.0f}", None, "الإيرادات منذ بداية البيانات حتى نهاية الفترة"),
+    }
+    for column, name in zip(st.columns(len(period_choice)), period_choice):
+        value, delta, help_text = period_metrics[name]
+        with column:
+            st.metric(name, value, delta, help=help_text)
 
 st.divider()
 
-color_palette = px.colors.qualitative.Set2
-
 st.subheader("📈 الإيرادات بمرور الوقت")
 
 # إضافة فلتر لاختيار نوع الإيرادات
@@ -149,38 +179,51 @@ revenue_type = st.selectbox(
     key="revenue_type"
 )
 
-if revenue_type == "الإيرادات الكلية":
-    # حساب الإيرادات الكلية حسب التاريخ
-    time_data = filtered_df.groupby("التاريخ")["الإيرادات"].sum().reset_index()
-    fig_time = px.line(
-        time_data,
-        x="التاريخ",
-        y="الإيرادات",
-        markers=True,
-        color_discrete_sequence=[PRIMARY_COLOR],  # لون واحد للإيرادات الكلية
-        title="الإيرادات الكلية اليومية",
-        template='plotly_white'
-    )
-    fig_time.update_traces(
-        line=dict(width=3, dash="solid"),
-        hovertemplate="التاريخ: %{x|%Y-%m-%d}<br>الإيرادات: %{y:,.0f}",
-    )
-else:
-    # إضافة فلتر لاختيار المنتج
+# اختيار مستوى التجميع الزمني للرسم
+rollup_name = st.selectbox("التجميع الزمني:", list(ROLLUPS), key="time_rollup")
+rollup_titles = {"يومي": "اليومية", "أسبوعي": "الأسبوعية", "شهري": "الشهرية"}
+
+# إضافة فلتر لاختيار المنتج عند اختيار إيرادات منتج معين
+selected_product = None
+if revenue_type != "الإيرادات الكلية":
     selected_product = st.selectbox(
         "اختر المنتج:",
-        filtered_df["المنتج"].unique(),
+        aggregates.appearance_order(filter_key, "المنتج", product_series.index, selection),
         key="selected_product_time"
     )
-    # تصفية البيانات بناءً على المنتج المختار
-    time_data = filtered_df[filtered_df["المنتج"] == selected_product][["التاريخ", "الإيرادات"]]
+
+# المتوسط المتحرك والإجمالي التراكمي كخطوط إضافية على الرسم
+time_overlays = st.multiselect("إضافات على الرسم:", OVERLAYS, key="time_overlays")
+
+# تقليل عدد النقاط المرسلة للمتصفح بما يناسب عرض الرسم مهما طالت الفترة
+TIME_CHART_WIDTH = 1800
+
+@profiled("figure:time_figure")
+@cached("time_figure")
+@sized
+def time_figure(filter_key, revenue_type, selected_product, rollup_name, overlays, _selection):
+    # plotly.express يُستورد داخل دوال الرسوم عند أول رسم فقط (استيراده ثقيل)،
+    # فتظهر الفلاتر والمؤشرات قبل اكتماله
+    import plotly.express as px
+
+    signature, products, regions, start_date, end_date = filter_key
+    if revenue_type == "الإيرادات الكلية":
+        time_title = "الإيرادات الكلية"
+    else:
+        time_title = f"إيرادات المنتج {selected_product}"
+    time_data = pipeline.time_frame(
+        data, _selection, regions, start_date, end_date, selected_product, rollup_name, TIME_CHART_WIDTH
+    )
+    if overlays:
+        timeline = aggregates.timeline(signature, products if selected_product is None else (selected_product,), regions, data)
+        time_data = pipeline.time_overlays(time_data, timeline, rollup_name, start_date, end_date)
     fig_time = px.line(
         time_data,
         x="التاريخ",
         y="الإيرادات",
         markers=True,
-        color_discrete_sequence=[PRIMARY_COLOR],  # لون واحد للمنتج المختار
-        title=f"إيرادات المنتج {selected_product} اليومية",
+        color_discrete_sequence=[PRIMARY_COLOR],  # لون واحد للسلسلة المعروضة
+        title=f"{time_title} {rollup_titles[rollup_name]}",
         template='plotly_white'
     )
     fig_time.update_traces(
@@ -188,79 +231,121 @@ else:
         hovertemplate="التاريخ: %{x|%Y-%m-%d}<br>الإيرادات: %{y:,.0f}",
     )
 
-# إعدادات الرسم البياني
-fig_time.update_layout(
-    title_x=0.5,
-    xaxis_title="التاريخ",
-    yaxis_title="الإيرادات",
-    plot_bgcolor="white",
-    paper_bgcolor="white",
-    yaxis=dict(showgrid=True, gridcolor='lightgray', gridwidth=1, zeroline=True, zerolinecolor="gray"),
-    xaxis=dict(showgrid=True, gridcolor='lightgray', gridwidth=1),
-    legend_title_text="المنتج",
-    hovermode="x unified",
-    font=dict(family="Cairo", size=14, color=TEXT_COLOR),
-    width=1800,
-    height=600
-)
-st.plotly_chart(fig_time, use_container_width=True, config={"staticPlot": True})
+    # إعدادات الرسم البياني
+    fig_time.update_layout(
+        title_x=0.5,
+        xaxis_title="التاريخ",
+        yaxis_title="الإيرادات",
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        yaxis=dict(showgrid=True, gridcolor='lightgray', gridwidth=1, zeroline=True, zerolinecolor="gray"),
+        xaxis=dict(showgrid=True, gridcolor='lightgray', gridwidth=1),
+        legend_title_text="المنتج",
+        hovermode="x unified",
+        font=dict(family="Cairo", size=14, color=TEXT_COLOR),
+        width=TIME_CHART_WIDTH,
+        height=600
+    )
+    if "المتوسط المتحرك" in overlays:
+        fig_time.add_scatter(
+            x=time_data["التاريخ"], y=time_data["المتوسط المتحرك"], mode="lines",
+            name=f"المتوسط المتحرك ({MOVING_PERIODS[rollup_name]} فترات)",
+            line=dict(color="#FF8C00", width=2, dash="dash"),
+            hovertemplate="المتوسط المتحرك: %{y:,.0f}",
+        )
+    if "الإجمالي التراكمي" in overlays:
+        # على محور ثانٍ لأن الإجمالي التراكمي أكبر بكثير من قيم الفترات
+        fig_time.add_scatter(
+            x=time_data["التاريخ"], y=time_data["الإجمالي التراكمي"], mode="lines", yaxis="y2",
+            name="الإجمالي التراكمي", line=dict(color="#2E8B57", width=2, dash="dot"),
+            hovertemplate="الإجمالي التراكمي: %{y:,.0f}",
+        )
+        fig_time.update_layout(yaxis2=dict(title="الإجمالي التراكمي", overlaying="y", side="right", showgrid=False))
+    if overlays:
+        fig_time.update_traces(selector=0, name="الإيرادات", showlegend=True)
+    return fig_time
+
+fig_time = time_figure(filter_key, revenue_type, selected_product, rollup_name, tuple(time_overlays), selection)
+plot_chart(fig_time, "الإيرادات بمرور الوقت")
 st.subheader("📦 الإيرادات حسب المنتج")
-fig_product = px.pie(
-    filtered_df, names="المنتج", values="الإيرادات", hole=0.3,
-    color_discrete_sequence=color_palette, title="نسبة الإيرادات حسب المنتج",
-    template='plotly_white'
-)
-fig_product.update_traces(
-    hovertemplate="المنتج: %{label}<br>الإيرادات: %{value:,.0f}<br>النسبة: %{percent}",
-    pull=[0.05] * len(filtered_df['المنتج'].unique()),
-    textinfo='percent+label'
-)
-fig_product.update_layout(
-    title_x=0.5,
-    legend_title_text="المنتج",
-    font=dict(family="Cairo", size=14, color=TEXT_COLOR),
-    width=1200,
-    height=500
-)
-st.plotly_chart(fig_product, use_container_width=True, config={"staticPlot": True})
+@profiled("figure:product_figure")
+@cached("product_figure")
+@sized
+def product_figure(filter_key, _product_series):
+    import plotly.express as px
+
+    product_data = pipeline.product_frame(_product_series)
+    fig_product = px.pie(
+        product_data, names="المنتج", values="الإيرادات", hole=0.3,
+        color_discrete_sequence=px.colors.qualitative.Set2, title="نسبة الإيرادات حسب المنتج",
+        template='plotly_white'
+    )
+    fig_product.update_traces(
+        hovertemplate="المنتج: %{label}<br>الإيرادات: %{value:,.0f}<br>النسبة: %{percent}",
+        pull=[0.05] * len(product_data),
+        textinfo='percent+label'
+    )
+    fig_product.update_layout(
+        title_x=0.5,
+        legend_title_text="المنتج",
+        font=dict(family="Cairo", size=14, color=TEXT_COLOR),
+        width=1200,
+        height=500
+    )
+    return fig_product
+
+fig_product = product_figure(filter_key, product_series)
+plot_chart(fig_product, "الإيرادات حسب المنتج")
 
 st.subheader("🏙️ الإيرادات حسب المنطقة")
-region_data = filtered_df.groupby("المنطقة")["الإيرادات"].sum().reset_index()
-region_data = region_data.sort_values(by="الإيرادات")  # ترتيب من الصغير إلى الكبير
-fig_region = px.bar(
-    region_data, x="المنطقة", y="الإيرادات", color="المنطقة",
-    color_discrete_sequence=color_palette, title="إجمالي الإيرادات لكل منطقة",
-    template='plotly_white'
-)
-fig_region.update_traces(
-    hovertemplate="المنطقة: %{x}<br>الإيرادات: %{y:,.0f}",
-    texttemplate='%{y:,.0f}',
-    textposition='auto'
-)
-fig_region.update_layout(
-    title_x=0.5,
-    xaxis_title="المنطقة",
-    yaxis_title="الإيرادات",
-    plot_bgcolor="white",
-    paper_bgcolor="white",
-    yaxis=dict(range=[0, region_data["الإيرادات"].max() * 1.1], showgrid=True, gridcolor='lightgray'),
-    showlegend=False,
-    font=dict(family="Cairo", size=14, color=TEXT_COLOR),
-    width=1200,
-    height=500
-)
-st.plotly_chart(fig_region, use_container_width=True, config={"staticPlot": True})
+@profiled("figure:region_figure")
+@cached("region_figure")
+@sized
+def region_figure(filter_key, _region_series):
+    import plotly.express as px
+
+    region_data = pipeline.region_frame(_region_series)
+    fig_region = px.bar(
+        region_data, x="المنطقة", y="الإيرادات", color="المنطقة",
+        color_discrete_sequence=px.colors.qualitative.Set2, title="إجمالي الإيرادات لكل منطقة",
+        template='plotly_white'
+    )
+    fig_region.update_traces(
+        hovertemplate="المنطقة: %{x}<br>الإيرادات: %{y:,.0f}",
+        texttemplate='%{y:,.0f}',
+        textposition='auto'
+    )
+    fig_region.update_layout(
+        title_x=0.5,
+        xaxis_title="المنطقة",
+        yaxis_title="الإيرادات",
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        yaxis=dict(range=[0, region_data["الإيرادات"].max() * 1.1], showgrid=True, gridcolor='lightgray'),
+        showlegend=False,
+        font=dict(family="Cairo", size=14, color=TEXT_COLOR),
+        width=1200,
+        height=500
+    )
+    return fig_region
+
+fig_region = region_figure(filter_key, region_series)
+plot_chart(fig_region, "الإيرادات حسب المنطقة")
 
 st.divider()
 
 st.subheader("📊 مقارنات تفصيلية")
-tabs = st.tabs(["مقارنة المنتجات حسب المناطق", "مقارنة المناطق حسب المنتجات", "مقارنة المنتجات حسب الأيام", "مقارنة المناطق حسب الأيام"])
-
-with tabs[0]:
-    prod_region_data = filtered_df.groupby(["المنتج", "المنطقة"])["الإيرادات"].sum().reset_index()
+# كل تبويب يُحسب ويُرسم فقط عند فتحه، ونتائجه محفوظة حسب حالة الفلاتر
+@profiled("figure:product_region_figure")
+@cached("product_region_figure")
+@sized
+def product_region_figure(filter_key, _selection):
+    import plotly.express as px
+
+    prod_region_data = pipeline.product_region_frame(_selection)
     fig_prod_region = px.bar(
         prod_region_data, x="المنتج", y="الإيرادات", color="المنطقة",
-        barmode="group", color_discrete_sequence=color_palette,
+        barmode="group", color_discrete_sequence=px.colors.qualitative.Set2,
         title="مبيعات كل منتج موزعة على المناطق",
         template='plotly_white'
     )
@@ -282,14 +367,18 @@ with tabs[0]:
         width=1200,
         height=500
     )
-    st.plotly_chart(fig_prod_region, use_container_width=True, config={"staticPlot": True})
+    return fig_prod_region
 
-with tabs[1]:
-    region_prod_data = filtered_df.groupby(["المنطقة", "المنتج"])["الإيرادات"].sum().reset_index()
-    region_prod_data = region_prod_data.sort_values(by="الإيرادات")  # ترتيب من الصغير إلى الكبير
+@profiled("figure:region_product_figure")
+@cached("region_product_figure")
+@sized
+def region_product_figure(filter_key, _selection):
+    import plotly.express as px
+
+    region_prod_data = pipeline.region_product_frame(_selection)
     fig_region_prod = px.bar(
         region_prod_data, x="المنطقة", y="الإيرادات", color="المنتج",
-        barmode="group", color_discrete_sequence=color_palette,
+        barmode="group", color_discrete_sequence=px.colors.qualitative.Set2,
         title="مبيعات كل منطقة موزعة على المنتجات",
         template='plotly_white'
     )
@@ -311,17 +400,18 @@ with tabs[1]:
         width=1200,
         height=500
     )
-    st.plotly_chart(fig_region_prod, use_container_width=True, config={"staticPlot": True})
+    return fig_region_prod
 
-with tabs[2]:
-    prod_day_data = filtered_df.groupby(["المنتج", "يوم_الأسبوع"])["الإيرادات"].sum().reset_index()
-    # ترتيب الأيام حسب ترتيب الأسبوع
-    day_order = ['الإثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
-    prod_day_data['يوم_الأسبوع'] = pd.Categorical(prod_day_data['يوم_الأسبوع'], categories=day_order, ordered=True)
-    prod_day_data = prod_day_data.sort_values(by=["المنتج", "يوم_الأسبوع"])
+@profiled("figure:product_day_figure")
+@cached("product_day_figure")
+@sized
+def product_day_figure(filter_key, _selection):
+    import plotly.express as px
+
+    prod_day_data = pipeline.product_day_frame(_selection)
     fig_prod_day = px.bar(
         prod_day_data, x="المنتج", y="الإيرادات", color="يوم_الأسبوع",
-        barmode="group", color_discrete_sequence=color_palette,
+        barmode="group", color_discrete_sequence=px.colors.qualitative.Set2,
         title="مبيعات كل منتج موزعة على الأيام",
         template='plotly_white'
     )
@@ -343,16 +433,18 @@ with tabs[2]:
         width=1200,
         height=500
     )
-    st.plotly_chart(fig_prod_day, use_container_width=True, config={"staticPlot": True})
+    return fig_prod_day
 
-with tabs[3]:
-    region_day_data = filtered_df.groupby(["المنطقة", "يوم_الأسبوع"])["الإيرادات"].sum().reset_index()
-    # ترتيب الأيام حسب ترتيب الأسبوع
-    region_day_data['يوم_الأسبوع'] = pd.Categorical(region_day_data['يوم_الأسبوع'], categories=day_order, ordered=True)
-    region_day_data = region_day_data.sort_values(by=["المنطقة", "يوم_الأسبوع"])
+@profiled("figure:region_day_figure")
+@cached("region_day_figure")
+@sized
+def region_day_figure(filter_key, _selection):
+    import plotly.express as px
+
+    region_day_data = pipeline.region_day_frame(_selection)
     fig_region_day = px.bar(
         region_day_data, x="المنطقة", y="الإيرادات", color="يوم_الأسبوع",
-        barmode="group", color_discrete_sequence=color_palette,
+        barmode="group", color_discrete_sequence=px.colors.qualitative.Set2,
         title="مبيعات كل منطقة موزعة على الأيام",
         template='plotly_white'
     )
@@ -374,7 +466,25 @@ with tabs[3]:
         width=1200,
         height=500
     )
-    st.plotly_chart(fig_region_day, use_container_width=True, config={"staticPlot": True})
+    return fig_region_day
+
+tabs = st.tabs(
+    ["مقارنة المنتجات حسب المناطق", "مقارنة المناطق حسب المنتجات", "مقارنة المنتجات حسب الأيام", "مقارنة المناطق حسب الأيام"],
+    key="comparison_tabs",
+    on_change="rerun"
+)
+with tabs[0]:
+    if tabs[0].open or PRELOAD:
+        plot_chart(product_region_figure(filter_key, selection), "مقارنة المنتجات حسب المناطق")
+with tabs[1]:
+    if tabs[1].open or PRELOAD:
+        plot_chart(region_product_figure(filter_key, selection), "مقارنة المناطق حسب المنتجات")
+with tabs[2]:
+    if tabs[2].open or PRELOAD:
+        plot_chart(product_day_figure(filter_key, selection), "مقارنة المنتجات حسب الأيام")
+with tabs[3]:
+    if tabs[3].open or PRELOAD:
+        plot_chart(region_day_figure(filter_key, selection), "مقارنة المناطق حسب الأيام")
 
 st.divider()
 
@@ -382,34 +492,15 @@ st.divider()
 st.subheader("📊 تحليل تأثير الأيام على المبيعات")
 st.caption("تحليل كيفية تأثير أيام الأسبوع على مبيعات منتج معين في منطقة معينة")
 
-# فلاتر لاختيار المنتج والمنطقة
-col1, col2 = st.columns(2)
-with col1:
-    selected_product = st.selectbox("اختر المنتج:", filtered_df["المنتج"].unique(), key="analysis_product")
-with col2:
-    selected_region = st.selectbox("اختر المنطقة:", filtered_df["المنطقة"].unique(), key="analysis_region")
-
-# تصفية البيانات بناءً على المنتج والمنطقة المختارة
-analysis_df = filtered_df[
-    (filtered_df["المنتج"] == selected_product) &
-    (filtered_df["المنطقة"] == selected_region)
-].groupby("يوم_الأسبوع")["الإيرادات"].sum().reset_index()
-
-# ترتيب الأيام حسب ترتيب الأسبوع
-analysis_df['يوم_الأسبوع'] = pd.Categorical(analysis_df['يوم_الأسبوع'], categories=day_order, ordered=True)
-analysis_df = analysis_df.sort_values(by="يوم_الأسبوع")
-
-# حساب المتوسط واليوم الأعلى والأقل
-if not analysis_df.empty:
-    avg_sales = analysis_df["الإيرادات"].mean()
-    max_day = analysis_df.loc[analysis_df["الإيرادات"].idxmax()]
-    min_day = analysis_df.loc[analysis_df["الإيرادات"].idxmin()]
-    max_percentage = ((max_day["الإيرادات"] - avg_sales) / avg_sales * 100) if avg_sales > 0 else 0
-    min_percentage = ((avg_sales - min_day["الإيرادات"]) / avg_sales * 100) if avg_sales > 0 else 0
+@profiled("figure:day_impact")
+@cached("day_impact")
+@sized
+def day_impact_figure(filter_key, selected_product, selected_region, _analysis_df):
+    import plotly.express as px
 
     # رسم بياني للمبيعات حسب الأيام
     fig_analysis = px.bar(
-        analysis_df,
+        _analysis_df,
         x="يوم_الأسبوع",
         y="الإيرادات",
         title=f"مبيعات {selected_product} في {selected_region} حسب الأيام",
@@ -434,27 +525,151 @@ if not analysis_df.empty:
         width=1200,
         height=500
     )
-    st.plotly_chart(fig_analysis, use_container_width=True, config={"staticPlot": True})
-
-    # عرض الإحصائيات
-    st.markdown(f"**المتوسط اليومي للمبيعات:** {avg_sales:,.0f}")
-    st.markdown(f"**اليوم الأعلى مبيعًا:** {max_day['يوم_الأسبوع']} ({max_day['الإيرادات']:,.0f}, +{max_percentage:.1f}%)")
-    st.markdown(f"**اليوم الأقل مبيعًا:** {min_day['يوم_الأسبوع']} ({min_day['الإيرادات']:,.0f}, -{min_percentage:.1f}%)")
-else:
-    st.write("لا توجد بيانات كافية للتحليل بناءً على الاختيارات الحالية.")
+    return fig_analysis
+
+# يُحسب التحليل فقط عند فتح القسم
+analysis_section = st.expander("عرض التحليل", key="analysis_section", on_change="rerun")
+with analysis_section:
+    if analysis_section.open or PRELOAD:
+        # فلاتر لاختيار المنتج والمنطقة
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_product = st.selectbox("اختر المنتج:", aggregates.appearance_order(filter_key, "المنتج", product_series.index, selection), key="analysis_product")
+        with col2:
+            selected_region = st.selectbox("اختر المنطقة:", aggregates.appearance_order(filter_key, "المنطقة", region_series.index, selection), key="analysis_region")
+
+        # تصفية البيانات بناءً على المنتج والمنطقة المختارة، وحساب المتوسط واليوم الأعلى والأقل
+        analysis_df, impact_stats = aggregates.day_impact(filter_key, selected_product, selected_region, data)
+        if impact_stats is not None:
+            avg_sales, max_day, min_day, max_percentage, min_percentage = impact_stats
+
+            plot_chart(day_impact_figure(filter_key, selected_product, selected_region, analysis_df), "تحليل تأثير الأيام")
+
+            # عرض الإحصائيات
+            st.markdown(f"**المتوسط اليومي للمبيعات:** {avg_sales:,.0f}")
+            st.markdown(f"**اليوم الأعلى مبيعًا:** {max_day['يوم_الأسبوع']} ({max_day['الإيرادات']:,.0f}, +{max_percentage:.1f}%)")
+            st.markdown(f"**اليوم الأقل مبيعًا:** {min_day['يوم_الأسبوع']} ({min_day['الإيرادات']:,.0f}, -{min_percentage:.1f}%)")
+        else:
+            st.write("لا توجد بيانات كافية للتحليل بناءً على الاختيارات الحالية.")
 
 st.divider()
 
 st.subheader("📋 البيانات التفصيلية")
 st.caption("عرض جميع البيانات المفلترة في جدول تفاعلي")
-st.dataframe(filtered_df, use_container_width=True)
 
+@cached("table_rows")
+def table_rows(filter_key, search_text, sort_column, ascending, _selection):
+    return _selection.table(search_text, sort_column, ascending)
+
+# الجدول والتحميل يحتاجان الصفوف نفسها، فلا تُنسخ إلا عند فتح القسم
+details_section = st.expander("عرض البيانات", key="details_section", on_change="rerun")
+with details_section:
+    if details_section.open or PRELOAD:
+        # البحث والترتيب على الخادم، ولا يُرسل للمتصفح إلا صفوف الصفحة الحالية
+        table_cols = st.columns(4)
+        with table_cols[0]:
+            search_text = st.text_input("بحث في المنتج أو المنطقة:", key="table_search")
+        with table_cols[1]:
+            sort_column = st.selectbox("ترتيب حسب:", SORT_COLUMNS, key="table_sort")
+        with table_cols[2]:
+            sort_order = st.selectbox("اتجاه الترتيب:", ["تصاعدي", "تنازلي"], key="table_order")
+        with table_cols[3]:
+            page_size = st.selectbox("عدد الصفوف في الصفحة:", PAGE_SIZES, key="table_page_size")
+
+        with stage("table") as record:
+            table = table_rows(filter_key, search_text, sort_column, sort_order == "تصاعدي", selection)
+            record["rows"] = len(table)
+        total_pages = page_count(len(table), page_size)
+        # إعادة رقم الصفحة إلى النطاق المسموح عند تقلص النتائج
+        if st.session_state.get("table_page", 1) > total_pages:
+            st.session_state["table_page"] = total_pages
+        page = st.number_input("الصفحة:", min_value=1, max_value=total_pages, value=1, step=1, key="table_page")
+        st.caption(f"إجمالي الصفوف: {len(table):,} · الصفحة {page:,} من {total_pages:,}")
+        with stage("table_page") as record:
+            page_frame = table.page(page, page_size)
+            st.dataframe(page_frame, width="stretch")
+            record["rows"] = len(page_frame)
+            record["bytes"] = int(page_frame.memory_usage(deep=True).sum())
+
+# يُولَّد ملف التحميل فقط عند الضغط على الزر، جزءًا بجزء من الصفوف المفلترة. الاختيار يُحل من جديد
+# عند الضغط: الملف قد يتحدث بين عرض الصفحة والضغط، والاختيار المحفوظ لا يُبقي نسخته القديمة حية.
+# Streamlit يحتفظ بالملف كله في الذاكرة حتى يُرسل، فيُقرأ من الملف المؤقت ثم يُغلق ويُحذف
+def export_download(filter_key, export_format):
+    view = aggregates.refresh(load_data())
+    selection = aggregates.selection(aggregates.filter_key(view, *filter_key[1:]), view)
+    with stage("export") as record, pipeline.export(selection, export_format) as handle:
+        data = handle.read()
+        record["rows"] = len(selection)
+        record["bytes"] = len(data)
+    return data
+
+export_format = st.selectbox("صيغة التحميل:", available_formats(), key="export_format")
+export_suffix, export_mime = EXPORT_FORMATS[export_format]
 st.download_button(
-    label="⬇️ تحميل البيانات المفلترة (CSV)",
-    data=filtered_df.to_csv(index=False),
-    file_name="المبيعات_المفلترة.csv",
-    mime="text/csv"
+    label=f"⬇️ تحميل البيانات المفلترة ({export_format})",
+    data=partial(export_download, filter_key, export_format),
+    file_name="المبيعات_المفلترة" + export_suffix,
+    mime=export_mime
 )
+st.caption("الملف يُحمَّل كاملًا في ذاكرة الخادم قبل إرساله؛ للملفات الكبيرة استخدم /export في واجهة JSON (api.py) التي ترسله جزءًا بجزء")
+
+# إحصائيات ذاكرة النتائج المشتركة بين الجلسات (تُعرض بعد حساب كل الأقسام)
+with st.sidebar:
+    st.subheader("ذاكرة النتائج")
+    cache_stats = RESULT_CACHE.stats()
+    st.caption(
+        f"إصابات: {cache_stats['hits']:,} · إخفاقات: {cache_stats['misses']:,} · نسبة الإصابة: {cache_stats['hit_rate']:.0%}"
+    )
+    st.caption(
+        f"الحجم: {cache_stats['bytes'] / 2**20:,.1f} / {cache_stats['max_bytes'] / 2**20:,.0f} MB"
+        f" · العناصر: {cache_stats['entries']:,} · المُخرجة: {cache_stats['evictions']:,}"
+    )
+
+profile.finish()
+
+
+@cached("memory_report")
+def column_memory(signature, _data):
+    return _data.memory_report()
+
+# لوحة الأداء: مراحل إعادة التشغيل الحالية والإحصائيات المتراكمة منذ بدء العملية
+if DASHBOARD_DEBUG or st.query_params.get("debug") == "1":
+    with st.sidebar:
+        st.subheader("⏱️ أداء إعادة التشغيل")
+        st.caption(f"الزمن الكلي: {profile.seconds * 1000:,.1f} ms")
+        stages_df = pd.DataFrame(profile.stages, columns=["stage", "seconds", "rows", "bytes"])
+        stages_df["seconds"] = stages_df["seconds"] * 1000
+        st.dataframe(
+            stages_df.rename(columns={"stage": "المرحلة", "seconds": "الزمن (ms)", "rows": "الصفوف", "bytes": "البايتات"}),
+            hide_index=True
+        )
+        metrics = METRICS.snapshot()
+        st.caption(f"منذ بدء العملية: {metrics['reruns']:,} إعادة تشغيل")
+        totals_df = pd.DataFrame([
+            {
+                "المرحلة": name,
+                "المرات": stats["count"],
+                "المتوسط (ms)": stats["seconds"] / stats["count"] * 1000,
+                "الأقصى (ms)": stats["max_seconds"] * 1000,
+            }
+            for name, stats in metrics["stages"].items()
+        ])
+        st.dataframe(totals_df, hide_index=True)
+        if hasattr(data, "memory_report"):
+            # ذاكرة أعمدة الإطار في الذاكرة مقارنة بالتمثيل النصي السابق
+            st.caption("ذاكرة الأعمدة (MB)")
+            memory_df = column_memory(data_signature, data)
+            memory_df = memory_df.assign(**{column: memory_df[column] / 2**20 for column in ("before", "after", "saved")})
+            st.dataframe(memory_df.rename(
+                columns={"dtype": "النوع", "before": "قبل", "after": "بعد", "saved": "الموفَّر"}
+            ).rename_axis("العمود"))
+        st.download_button("تحميل المقاييس (Prometheus)", METRICS.prometheus(), file_name="metrics.prom", mime="text/plain")
+        st.download_button(
+            "تحميل السجل (JSON)",
+            json.dumps({"rerun": profile.to_dict(), "totals": metrics}, ensure_ascii=False),
+            file_name="profile.json",
+            mime="application/json"
+        )
 
 st.divider()
 st.caption("""
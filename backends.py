@@ -0,0 +1,573 @@
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from codes import day_number, label_codes
+from cube import DAY_ORDER, weekday_labels, with_weekday
+from dataset import SalesData, memory_report
+from ingest import CHUNK_ROWS, source_signature, store_lock, update_store
+from shards import map_shards, month_shards
+from table import page_positions, search_masks, table_length
+from timeline import RevenueTimeline
+
+# محرك البيانات: pandas (في الذاكرة) أو sqlite أو duckdb (ملف على القرص)
+DASHBOARD_BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas")
+BACKENDS = ("pandas", "sqlite", "duckdb")
+
+# يُزاد عند تغيير مخطط جدول sales فتُعاد كتابة القواعد القديمة
+SQL_SCHEMA = 2
+
+
+def open_backend(path, cache_dir, name=DASHBOARD_BACKEND):
+    if name == "pandas":
+        return PandasBackend(path, cache_dir)
+    if name == "sqlite":
+        return SQLBackend(path, cache_dir, "sqlite")
+    if name == "duckdb":
+        # duckdb اختياري ولا يُستخدم إلا إن كان مثبتًا
+        if importlib.util.find_spec("duckdb") is None:
+            raise ImportError("المحرك duckdb غير مثبت")
+        return SQLBackend(path, cache_dir, "duckdb")
+    raise ValueError(f"محرك بيانات غير معروف: {name}")
+
+
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_backend(path, cache_dir, name=DASHBOARD_BACKEND):
+    # محرك واحد لكل (ملف، مجلد كاش، نوع) في العملية: اللوحة وواجهة JSON تقرآن البيانات نفسها
+    # فلا تُحمَّل مرتين في الذاكرة وتتطابق توقيعاتها ومفاتيح ذاكرة النتائج
+    key = (os.path.abspath(path), os.path.abspath(cache_dir), name)
+    with _SHARED_LOCK:
+        if key not in _SHARED:
+            _SHARED[key] = open_backend(path, cache_dir, name)
+        return _SHARED[key]
+
+
+# كل محرك يعيد من refresh() عرضًا للبيانات الحالية فيه الدوال نفسها:
+# products() و regions() و date_range() و select() و timeline()، والاختيار الناتج يوفر
+# total() و sum_by() و appearance_order() و table() و frames()
+
+
+class PandasBackend:
+    # كل البيانات في الذاكرة: الإطار والمكعب وفهرس الصفوف
+
+    def __init__(self, path, cache_dir):
+        self.data = SalesData(path, cache_dir)
+        self._view = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        # عرض واحد لكل نسخة من البيانات يبقى ما دامت النسخة حالية؛ الاختيارات المحفوظة تشير إليه بمرجع ضعيف
+        snapshot = self.data.refresh()
+        with self._lock:
+            if self._view is None or self._view.df is not snapshot[0]:
+                self._view = PandasView(*snapshot)
+            return self._view
+
+
+class PandasView:
+
+    def __init__(self, df, cube, row_index, timeline, signature):
+        self.df = df
+        self.cube = cube
+        self.row_index = row_index
+        self._timeline = timeline
+        self.signature = signature
+        self._revenue_order = None
+        self._lock = threading.Lock()
+
+    def products(self):
+        return self.row_index.first_appearance("المنتج")
+
+    def regions(self):
+        return self.row_index.first_appearance("المنطقة")
+
+    def date_range(self):
+        # الصفوف مرتبة حسب التاريخ: أول تاريخ وآخره دون المرور على العمود
+        dates = self.row_index.dates
+        if len(dates) == 0:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def select(self, products, regions, start, end):
+        return PandasSelection(self, products, regions, start, end)
+
+    def timeline(self):
+        return self._timeline
+
+    def revenue_order(self):
+        # مواقع كل الصفوف مرتبة بالإيرادات (مستقرًا، الفارغة في الآخر)؛ تُحسب مرة لكل نسخة من البيانات
+        # عند أول ترتيب بالإيرادات، وتُقص منها صفحات كل الاختيارات
+        with self._lock:
+            if self._revenue_order is None:
+                order = np.argsort(self.df["الإيرادات"].to_numpy(), kind="stable")
+                self._revenue_order = order.astype(np.int32) if len(order) < 2**31 else order
+            return self._revenue_order
+
+    def memory_report(self):
+        return memory_report(self.df, self.cube)
+
+
+class PandasSelection:
+
+    def __init__(self, view, products, regions, start, end):
+        # الاختيار يُحفظ في ذاكرة النتائج، فلا يُبقي العرض (الإطار والمكعب والفهرس) في الذاكرة
+        # بعد تحديث البيانات؛ الجلسة التي تستخدمه تحتفظ بالعرض حتى نهاية إعادة التشغيل
+        self._view = weakref.ref(view)
+        self.rows = view.row_index.select(products, regions, start, end)
+        self.cells = view.cube.select(products, regions, start, end)
+
+    @property
+    def view(self):
+        return self._view()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.cells.nbytes
+
+    def total(self):
+        return self.cells.total()
+
+    def sum_by(self, *dims, week_order=False):
+        return self.cells.sum_by(*dims, week_order=week_order)
+
+    def appearance_order(self, labels, dimension):
+        return self.view.row_index.appearance_order(self.rows, labels, dimension)
+
+    def table(self, search_text, sort_column, ascending):
+        return PandasTable(self.view, self.rows, search_masks(self.view.row_index, search_text), sort_column, ascending)
+
+    def frames(self, chunk_rows):
+        # أجزاء متتالية من الصفوف المفلترة (جزء فارغ واحد على الأقل ليُكتب رأس الملف)
+        yield with_weekday(self.view.df.iloc[self.rows.segment(0, chunk_rows)])
+        for start in range(chunk_rows, len(self.rows), chunk_rows):
+            yield with_weekday(self.view.df.iloc[self.rows.segment(start, start + chunk_rows)])
+
+
+class PandasTable:
+
+    # لا تُرتب كل الصفوف المفلترة: كل صفحة تُقص من الاختيار أو من ترتيب جاهز لنسخة البيانات
+
+    def __init__(self, view, rows, masks, sort_column, ascending):
+        self._view = weakref.ref(view)
+        self.rows = rows
+        self.masks = masks
+        self.sort_column = sort_column
+        self.ascending = ascending
+        self.length = table_length(view.row_index, rows, masks)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        # الاختيار نفسه محسوب ضمن الاختيار المحفوظ في ذاكرة النتائج
+        return sum(mask.nbytes for mask in self.masks or ())
+
+    def page(self, page, page_size):
+        view = self._view()
+        revenue_order = view.revenue_order() if self.sort_column == "الإيرادات" else None
+        positions = page_positions(
+            view.row_index, self.rows, self.sort_column, self.ascending, self.masks, page, page_size, revenue_order
+        )
+        return with_weekday(view.df.iloc[positions])
+
+
+class SQLBackend:
+    # البيانات في قاعدة على القرص داخل مجلد الكاش؛ الفلاتر والتجميعات تُنفَّذ داخل المحرك
+    # ولا يعود إلى بايثون إلا النتائج المجمّعة وصفوف الصفحة الحالية.
+    # القاعدة تُبنى من المخزن العمودي، والصفوف الملحقة بملف CSV تُضاف إليها فقط
+
+    def __init__(self, path, cache_dir, engine="sqlite", chunk_rows=CHUNK_ROWS, workers=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.engine = engine
+        self.chunk_rows = chunk_rows
+        # عدد الخيوط لاستعلامات الأجزاء الشهرية (None = DASHBOARD_WORKERS)
+        self.workers = workers
+        self.filename = os.path.join(cache_dir, "sales." + engine)
+        self.signature = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self.refresh()
+
+    def refresh(self):
+        if source_signature(self.path) == self.signature:
+            return self
+        with self._lock:
+            if source_signature(self.path) != self.signature:
+                # عمال آخرون قد يحدّثون المخزن والقاعدة نفسيهما: المقارنة والإضافة تحت قفل بين العمليات
+                with store_lock(self.cache_dir):
+                    store, first_row = update_store(self.path, self.cache_dir, self.chunk_rows)
+                    self._sync(store, first_row)
+                self.signature = store.signature
+        return self
+
+    def connection(self):
+        # اتصال مستقل لكل خيط؛ ويُعاد فتحه بعد إعادة بناء القاعدة
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.connection = self._connect(self.filename)
+            local.generation = self._generation
+        return local.connection
+
+    def query(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def _connect(self, filename):
+        if self.engine == "duckdb":
+            import duckdb
+
+            return duckdb.connect(filename)
+        return sqlite3.connect(filename, check_same_thread=False)
+
+    def _sync(self, store, first_row):
+        info = self._read_info()
+        revenue_type = _revenue_type(store.revenue.dtype)
+        reusable = (
+            info is not None and first_row is not None and info["rows"] <= len(store)
+            and info["products"] == list(store.products) and info["regions"] == list(store.regions)
+            and info["revenue"] == revenue_type and info.get("schema") == SQL_SCHEMA
+        )
+        if reusable:
+            if info["rows"] < len(store):
+                connection = self._connect(self.filename)
+                try:
+                    self._insert(connection, store, info["rows"])
+                    _write_info(connection, store, revenue_type)
+                    connection.commit()
+                finally:
+                    connection.close()
+        else:
+            self._rebuild(store, revenue_type)
+        # القاعدة قد تكون استُبدلت في عملية أخرى: اتصالات الخيوط تُفتح من جديد
+        self._generation += 1
+        self.product_labels = pd.Index(list(store.products), dtype=object)
+        self.region_labels = pd.Index(list(store.regions), dtype=object)
+        self.revenue_dtype = store.revenue.dtype
+        # المجاميع بـ int64 حتى لو خُزنت الإيرادات بنوع أصغر
+        self.sum_dtype = np.promote_types(store.revenue.dtype, np.int64)
+        first, last = self.query("SELECT MIN(day), MAX(day) FROM sales")[0]
+        self.day_range = (first, last) if first is not None else (0, -1)
+        self._timeline = self._build_timeline()
+        # ترتيب أول ظهور للمنتجات والمناطق في كل الصفوف يُحسب مرة لكل نسخة من البيانات
+        # بدل استعلام على كامل الجدول في كل إعادة تشغيل
+        self._products = self.product_labels[self._first_appearance("product", "1 = 1", [])]
+        self._regions = self.region_labels[self._first_appearance("region", "1 = 1", [])]
+
+    def _build_timeline(self):
+        # مجاميع (منتج، منطقة، يوم) لكل جزء شهري بالتوازي؛ الأجزاء لا تتقاطع فكل مفتاح يظهر مرة واحدة
+        sql = (
+            "SELECT product, region, day, COALESCE(SUM(revenue), 0) FROM sales "
+            "WHERE day BETWEEN ? AND ? GROUP BY product, region, day"
+        )
+        parts = map_shards(
+            lambda shard: self.query(sql, [shard[0], shard[1] - 1]), month_shards(*self.day_range), self.workers
+        )
+        records = [record for part in parts for record in part]
+        columns = [np.asarray(column) for column in zip(*records)] or [np.empty(0, dtype=np.int64)] * 4
+        return RevenueTimeline.from_records(self.product_labels, self.region_labels, *columns)
+
+    def _rebuild(self, store, revenue_type):
+        if self.engine == "duckdb":
+            # duckdb يُبقي قاعدة واحدة لكل ملف مفتوحة في العملية فلا يرى ملفًا مستبدلًا؛
+            # يُعاد البناء داخلها في معاملة واحدة، والاستعلامات الجارية ترى النسخة السابقة حتى اكتمالها
+            connection = self._connect(self.filename)
+            try:
+                connection.execute("BEGIN TRANSACTION")
+                connection.execute("DROP TABLE IF EXISTS sales")
+                connection.execute("DROP TABLE IF EXISTS info")
+                self._create(connection, store, revenue_type)
+                connection.commit()
+            finally:
+                connection.close()
+            return
+        # البناء في ملف مؤقت ثم استبداله دفعة واحدة حتى لا تقرأ الجلسات قاعدة ناقصة
+        staging = self.filename + ".tmp"
+        if os.path.exists(staging):
+            os.remove(staging)
+        connection = self._connect(staging)
+        try:
+            self._create(connection, store, revenue_type)
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(staging, self.filename)
+
+    def _create(self, connection, store, revenue_type):
+        connection.execute(
+            f"CREATE TABLE sales (row_id INTEGER PRIMARY KEY, day INTEGER NOT NULL, "
+            f"product INTEGER NOT NULL, region INTEGER NOT NULL, revenue {revenue_type})"
+        )
+        connection.execute("CREATE TABLE info (key VARCHAR PRIMARY KEY, value VARCHAR NOT NULL)")
+        self._insert(connection, store, 0)
+        # الفهارس بعد الإدخال أسرع من تحديثها صفًا بصف
+        connection.execute("CREATE INDEX sales_day ON sales (day)")
+        connection.execute("CREATE INDEX sales_product_day ON sales (product, day)")
+        connection.execute("CREATE INDEX sales_region_day ON sales (region, day)")
+        _write_info(connection, store, revenue_type)
+
+    def _insert(self, connection, store, start):
+        for begin in range(start, len(store), self.chunk_rows):
+            end = min(begin + self.chunk_rows, len(store))
+            if self.engine == "duckdb":
+                # duckdb يقرأ أعمدة الجزء مباشرة من إطار مسجّل (NaN تصبح NULL) بدل إدخال صف بصف
+                connection.register("chunk", pd.DataFrame({
+                    "row_id": np.arange(begin, end), "day": store.days[begin:end],
+                    "product": store.product_codes[begin:end], "region": store.region_codes[begin:end],
+                    "revenue": store.revenue[begin:end],
+                }))
+                try:
+                    connection.execute("INSERT INTO sales SELECT row_id, day, product, region, revenue FROM chunk")
+                finally:
+                    connection.unregister("chunk")
+                continue
+            connection.executemany(
+                "INSERT INTO sales VALUES (?, ?, ?, ?, ?)",
+                zip(
+                    range(begin, end), store.days[begin:end].tolist(), store.product_codes[begin:end].tolist(),
+                    store.region_codes[begin:end].tolist(), _sql_values(store.revenue[begin:end])
+                )
+            )
+
+    def _read_info(self):
+        if not os.path.exists(self.filename):
+            return None
+        connection = self._connect(self.filename)
+        try:
+            rows = connection.execute("SELECT key, value FROM info").fetchall()
+        except Exception:
+            return None
+        finally:
+            connection.close()
+        return {key: json.loads(value) for key, value in rows}
+
+    def products(self):
+        return self._products
+
+    def regions(self):
+        return self._regions
+
+    def date_range(self):
+        return _timestamp(self.day_range[0]), _timestamp(self.day_range[1])
+
+    def select(self, products, regions, start, end):
+        return SQLSelection(self, products, regions, start, end)
+
+    def timeline(self):
+        return self._timeline
+
+    def _first_appearance(self, column, where, params):
+        # الفئات مرتبة حسب أول ظهور لها في الملف (رقم الصف) كما في unique() على الملف
+        return [code for (code,) in self.query(
+            f"SELECT {column} FROM sales WHERE {where} GROUP BY {column} ORDER BY MIN(row_id)", params
+        )]
+
+    def frame(self, records):
+        # صفوف الاستعلام (row_id, day, product, region, revenue) بنفس أعمدة الإطار وأنواعها
+        columns = list(zip(*records)) or [()] * 5
+        row_ids, days, products, regions, revenue = (np.asarray(column) for column in columns)
+        days = days.astype(np.int64)
+        return with_weekday(pd.DataFrame({
+            "التاريخ": pd.to_datetime(days, unit="D"),
+            "المنتج": pd.Categorical.from_codes(products.astype(np.int32), categories=self.product_labels),
+            "المنطقة": pd.Categorical.from_codes(regions.astype(np.int32), categories=self.region_labels),
+            "الإيرادات": revenue.astype(self.revenue_dtype),
+        }, index=pd.Index(row_ids.astype(np.int64))))
+
+
+class SQLSelection:
+    # شرط WHERE يطابق فلاتر المنتج والمنطقة والفترة؛ كل عملية استعلام داخل المحرك
+
+    def __init__(self, backend, products, regions, start, end):
+        self.backend = backend
+        # أول معاملين دائمًا حدود الفترة (تُستبدل بحدود كل جزء شهري)
+        clauses = ["day BETWEEN ? AND ?"]
+        self.params = [day_number(pd.Timestamp(start).ceil("D")), day_number(pd.Timestamp(end).floor("D"))]
+        for column, index, values in (("product", backend.product_labels, products), ("region", backend.region_labels, regions)):
+            codes = label_codes(index, values)
+            if len(codes) == 0:
+                clauses.append("1 = 0")
+            elif len(codes) < len(index):
+                clauses.append(f"{column} IN ({', '.join('?' * len(codes))})")
+                self.params += codes.tolist()
+        self.where = " AND ".join(clauses)
+        self._rows = None
+
+    def __len__(self):
+        # يُحسب مرة واحدة لكل اختيار (الاختيار نفسه محفوظ في ذاكرة النتائج)
+        if self._rows is None:
+            self._rows = self.backend.query(f"SELECT COUNT(*) FROM sales WHERE {self.where}", self.params)[0][0]
+        return self._rows
+
+    @property
+    def nbytes(self):
+        return len(self.where) + 8 * len(self.params)
+
+    def total(self):
+        # الإيرادات الفارغة (NULL) لا تدخل في SUM كما يتجاهل groupby().sum() القيم الناقصة
+        values = self._per_shard(f"SELECT SUM(revenue) FROM sales WHERE {self.where}")
+        return np.asarray(sum(records[0][0] or 0 for records in values)).astype(self.backend.sum_dtype)[()]
+
+    def sum_by(self, *dims, week_order=False):
+        # مكافئ لـ groupby(list(dims))["الإيرادات"].sum(): المجموعات الموجودة فقط مرتبة حسب المفاتيح
+        keys = ", ".join(_SQL_DIMENSIONS[dim] for dim in dims)
+        # مجاميع جزئية لكل شهر تُدمج بجمع القيم ذات المفتاح نفسه
+        merged = {}
+        sql = f"SELECT {keys}, COALESCE(SUM(revenue), 0) FROM sales WHERE {self.where} GROUP BY {keys}"
+        for records in self._per_shard(sql):
+            for *key, value in records:
+                merged[tuple(key)] = merged.get(tuple(key), 0) + value
+        records = [key + (value,) for key, value in merged.items()]
+        columns = [np.asarray(column) for column in zip(*records)] or [np.empty(0, dtype=np.int64)] * (len(dims) + 1)
+        codes = [column.astype(np.int64) for column in columns[:-1]]
+        # أكواد المنتج والمنطقة والتاريخ مرتبة كتسمياتها؛ أيام الأسبوع تُرتب حسب أسمائها
+        # (أو بترتيب الأسبوع مع week_order)
+        order = np.lexsort([
+            _WEEKDAY_RANK[code] if dim == "يوم_الأسبوع" and not week_order else code for dim, code in zip(dims, codes)
+        ][::-1])
+        labels = [self._labels(dim, code[order], week_order) for dim, code in zip(dims, codes)]
+        if len(dims) == 1:
+            index = labels[0].rename(dims[0])
+        else:
+            index = pd.MultiIndex.from_arrays(labels, names=list(dims))
+        revenue = columns[-1][order].astype(self.backend.sum_dtype)
+        return pd.Series(revenue, index=index, name="الإيرادات")
+
+    def _per_shard(self, sql):
+        # الاستعلام نفسه على كل جزء شهري يتقاطع مع الفترة المختارة، بالتوازي
+        first, last = self.backend.day_range
+        shards = month_shards(max(self.params[0], first), min(self.params[1], last))
+        return map_shards(
+            lambda shard: self.backend.query(sql, [shard[0], shard[1] - 1] + self.params[2:]), shards, self.backend.workers
+        )
+
+    def _labels(self, dim, codes, week_order=False):
+        if dim == "المنتج":
+            return self.backend.product_labels[codes]
+        if dim == "المنطقة":
+            return self.backend.region_labels[codes]
+        if dim == "يوم_الأسبوع":
+            if week_order:
+                return pd.CategoricalIndex(weekday_labels(codes))
+            return pd.Index(DAY_ORDER)[codes]
+        return pd.DatetimeIndex(pd.to_datetime(codes, unit="D"))
+
+    def appearance_order(self, labels, dimension):
+        index = self.backend.product_labels if dimension == "المنتج" else self.backend.region_labels
+        wanted = set(index.get_indexer(pd.Index(labels)).tolist())
+        column = _SQL_DIMENSIONS[dimension]
+        return index[[code for code in self.backend._first_appearance(column, self.where, self.params) if code in wanted]]
+
+    def table(self, search_text, sort_column, ascending):
+        return SQLTable(self, search_text, sort_column, ascending)
+
+    def frames(self, chunk_rows):
+        # قراءة الصفوف بالترتيب نفسه في الإطار (التاريخ ثم رقم الصف) جزءًا بجزء
+        cursor = self.backend.connection().cursor()
+        cursor.execute(
+            f"SELECT row_id, day, product, region, revenue FROM sales WHERE {self.where} ORDER BY day, row_id",
+            self.params
+        )
+        records = cursor.fetchmany(chunk_rows)
+        yield self.backend.frame(records)
+        while len(records) == chunk_rows:
+            records = cursor.fetchmany(chunk_rows)
+            if records:
+                yield self.backend.frame(records)
+
+
+class SQLTable:
+    # البحث والترتيب والصفحات عبر WHERE و ORDER BY و LIMIT/OFFSET
+
+    def __init__(self, selection, search_text, sort_column, ascending):
+        self.backend = selection.backend
+        self.where = selection.where
+        self.params = list(selection.params)
+        text = search_text.strip()
+        if text:
+            products = _matching(self.backend.product_labels, text)
+            regions = _matching(self.backend.region_labels, text)
+            matches = [f"product IN ({', '.join('?' * len(products))})"] if products else []
+            matches += [f"region IN ({', '.join('?' * len(regions))})"] if regions else []
+            self.where += f" AND ({' OR '.join(matches) or '1 = 0'})"
+            self.params += products + regions
+        # ترتيب مستقر كما في الجدول في الذاكرة: المفتاح ثم التاريخ ثم رقم الصف، ويُعكس كله تنازليًا
+        direction = "" if ascending else " DESC"
+        key = _SQL_DIMENSIONS.get(sort_column, "revenue")
+        keys = [] if sort_column == "التاريخ" else [key + direction]
+        if key == "revenue":
+            # الإيرادات الفارغة في آخر الترتيب التصاعدي وأوله تنازليًا كما في ترتيب الجدول في الذاكرة
+            keys = [f"revenue{direction} NULLS {'LAST' if ascending else 'FIRST'}"]
+        self.order = ", ".join(keys + ["day" + direction, "row_id" + direction])
+        self.rows = self.backend.query(f"SELECT COUNT(*) FROM sales WHERE {self.where}", self.params)[0][0]
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def nbytes(self):
+        return len(self.where) + len(self.order) + 8 * len(self.params)
+
+    def page(self, page, page_size):
+        records = self.backend.query(
+            f"SELECT row_id, day, product, region, revenue FROM sales WHERE {self.where} "
+            f"ORDER BY {self.order} LIMIT ? OFFSET ?",
+            self.params + [page_size, (page - 1) * page_size]
+        )
+        return self.backend.frame(records)
+
+
+# ترتيب أيام الأسبوع حسب أسمائها العربية (ترتيب مفاتيح groupby)
+_WEEKDAY_RANK = np.argsort(np.argsort(DAY_ORDER))
+
+_SQL_DIMENSIONS = {
+    "المنتج": "product",
+    "المنطقة": "region",
+    "يوم_الأسبوع": "(day + 3) % 7",
+    "التاريخ": "day",
+    "الإيرادات": "revenue",
+}
+
+
+def _write_info(connection, store, revenue_type):
+    info = {
+        "rows": len(store), "products": list(store.products), "regions": list(store.regions),
+        "revenue": revenue_type, "schema": SQL_SCHEMA,
+    }
+    connection.execute("DELETE FROM info")
+    connection.executemany(
+        "INSERT INTO info VALUES (?, ?)",
+        [(key, json.dumps(value, ensure_ascii=False)) for key, value in info.items()]
+    )
+
+
+def _sql_values(values):
+    # القيم الناقصة (NaN) تُكتب NULL
+    if values.dtype.kind != "f":
+        return values.tolist()
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _revenue_type(dtype):
+    return "BIGINT" if np.issubdtype(dtype, np.integer) else "DOUBLE"
+
+
+def _timestamp(day):
+    return pd.Timestamp(0) + pd.Timedelta(days=day)
+
+
+def _matching(index, text):
+    return np.flatnonzero(index.astype(str).str.contains(text, regex=False)).tolist()
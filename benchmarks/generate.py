@@ -0,0 +1,99 @@
+import argparse
+import string
+
+import numpy as np
+import pandas as pd
+
+GENERATE_CHUNK_ROWS = 1_000_000
+
+CITIES = [
+    "الرياض", "جدة", "مكة", "الدمام", "الخبر", "المدينة", "الطائف", "تبوك", "بريدة", "أبها",
+    "حائل", "جازان", "نجران", "الأحساء", "ينبع", "الجبيل", "القطيف", "خميس مشيط", "الباحة", "عرعر",
+]
+
+# وزن كل يوم من أيام الأسبوع (الإثنين أولًا): ذروة في نهاية الأسبوع
+WEEKDAY_WEIGHTS = np.array([0.95, 0.9, 0.95, 1.1, 1.2, 1.15, 0.9])
+
+
+def product_names(count):
+    # منتج A … منتج Z ثم منتج AA … كما في Dataset.csv
+    names = []
+    for number in range(count):
+        label = ""
+        number += 1
+        while number:
+            number, rest = divmod(number - 1, 26)
+            label = string.ascii_uppercase[rest] + label
+        names.append(f"منتج {label}")
+    return names
+
+
+def region_names(count):
+    return CITIES[:count] + [f"منطقة {number}" for number in range(len(CITIES) + 1, count + 1)]
+
+
+def generate(path, rows, products=5, regions=5, days=365, start="2025-01-01", seed=0, chunk_rows=GENERATE_CHUNK_ROWS,
+             shuffle=False):
+    # بيانات مبيعات مرتبة حسب التاريخ بنفس أعمدة Dataset.csv: شعبية المنتجات والمناطق غير متساوية
+    # (توزيع Zipf)، والإيرادات تتأثر بالمنتج ويوم الأسبوع. تُكتب على أجزاء فتناسب 100 مليون صف.
+    # مع shuffle تُسحب تواريخ كل جزء عشوائيًا بالتوزيع نفسه فلا يكون الملف مرتبًا (مسار الترتيب في sort_by_date)
+    rng = np.random.default_rng(seed)
+    product_labels = np.array(product_names(products), dtype=object)
+    region_labels = np.array(region_names(regions), dtype=object)
+    product_weights = _zipf(products)
+    region_weights = _zipf(regions)
+    product_price = rng.uniform(1500, 3500, products)
+    dates = pd.date_range(start, periods=days, freq="D")
+    date_labels = np.asarray(dates.strftime("%Y-%m-%d"), dtype=object)
+    weekday_factor = WEEKDAY_WEIGHTS[dates.dayofweek]
+
+    # عدد الصفوف في كل يوم متناسب مع وزن يوم الأسبوع
+    per_day = np.floor(rows * weekday_factor / weekday_factor.sum()).astype(np.int64)
+    per_day[:rows - per_day.sum()] += 1
+    day_ends = np.cumsum(per_day)
+
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        handle.write("التاريخ,المنتج,المنطقة,الإيرادات\n")
+        for begin in range(0, rows, chunk_rows):
+            day = _chunk_days(rng, per_day, day_ends, begin, min(begin + chunk_rows, rows), shuffle)
+            product = rng.choice(products, size=len(day), p=product_weights)
+            region = rng.choice(regions, size=len(day), p=region_weights)
+            revenue = np.rint(product_price[product] * weekday_factor[day] * rng.lognormal(0, 0.35, len(day)))
+            pd.DataFrame({
+                "التاريخ": date_labels[day],
+                "المنتج": product_labels[product],
+                "المنطقة": region_labels[region],
+                "الإيرادات": revenue.astype(np.int64),
+            }).to_csv(handle, index=False, header=False)
+    return path
+
+
+def _chunk_days(rng, per_day, day_ends, begin, stop, shuffle):
+    # أكواد أيام الصفوف من begin إلى stop دون بناء مصفوفة بطول كل الصفوف
+    if shuffle:
+        return rng.choice(len(per_day), size=stop - begin, p=per_day / day_ends[-1])
+    counts = np.clip(day_ends, begin, stop) - np.clip(day_ends - per_day, begin, stop)
+    return np.repeat(np.arange(len(per_day)), counts)
+
+
+def _zipf(count, exponent=0.8):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد بيانات مبيعات اصطناعية بصيغة Dataset.csv")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--regions", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shuffle", action="store_true", help="صفوف غير مرتبة حسب التاريخ")
+    args = parser.parse_args()
+    generate(args.path, args.rows, args.products, args.regions, args.days, args.start, args.seed, shuffle=args.shuffle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import SQLBackend  # noqa: E402
+from cube import SalesCube  # noqa: E402
+from generate import generate  # noqa: E402
+from shards import available_cpus  # noqa: E402
+
+# يقيس تسريع المسارين المقسَّمين إلى أجزاء شهرية لكل عدد خيوط:
+#   cube_build  بناء مكعب الإيرادات من الأكواد (from_sorted_codes)
+#   sql_filter  تجميعات فلتر واحد في محرك SQL: total() و sum_by() على الأجزاء المتقاطعة مع الفترة
+# التسريع لا يظهر إلا على جهاز بعدة أنوية؛ عدد الأنوية المتاحة يُطبع ويُحفظ مع النتائج
+
+
+def synthetic_codes(rows, products, regions, days, seed=0):
+    # أكواد صفوف مرتبة حسب التاريخ كما في الإطار بعد sort_by_date
+    rng = np.random.default_rng(seed)
+    date_codes = np.sort(rng.integers(0, days, rows, dtype=np.int32))
+    product_codes = rng.integers(0, products, rows, dtype=np.int32)
+    region_codes = rng.integers(0, regions, rows, dtype=np.int32)
+    revenue = rng.integers(100, 10_000, rows, dtype=np.int64)
+    dates = pd.date_range("2020-01-01", periods=days, freq="D")
+    return dates, product_codes, region_codes, date_codes, revenue
+
+
+def time_workers(name, rows, workers_list, repeat, run):
+    # أفضل زمن من repeat لكل عدد خيوط، والتسريع نسبة إلى أول عدد في القائمة
+    results = []
+    baseline = None
+    for workers in workers_list:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(workers)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        baseline = baseline or best
+        results.append({"workers": workers, "seconds": best, "speedup": baseline / best, "rows_per_s": rows / best})
+        print(f"{name:<11} workers={workers:>3}  {best:8.3f}s  speedup={baseline / best:5.2f}x  rows/s={rows / best:,.0f}")
+    return results
+
+
+def cube_build(args):
+    dates, product_codes, region_codes, date_codes, revenue = synthetic_codes(
+        args.rows, args.products, args.regions, args.days
+    )
+    products, regions = range(args.products), range(args.regions)
+    return time_workers("cube_build", args.rows, args.workers, args.repeat, lambda workers: SalesCube.from_sorted_codes(
+        products, regions, dates, product_codes, region_codes, date_codes, revenue, workers=workers
+    ))
+
+
+def sql_filter(args, work_dir):
+    # القاعدة تُبنى مرة واحدة؛ ثم يتغير عدد الخيوط فقط. الفلتر نصف المنتجات وكل المناطق على كامل الفترة
+    # فيمر بكل الأجزاء الشهرية كما في الفلتر الافتراضي للوحة
+    data_path = os.path.join(work_dir, "sales.csv")
+    generate(data_path, args.sql_rows, args.products, args.regions, args.days)
+    backend = SQLBackend(data_path, os.path.join(work_dir, "cache"))
+    products = list(backend.products()[: max(1, args.products // 2)])
+    regions = list(backend.regions())
+    start, end = backend.date_range()
+
+    def run(workers):
+        backend.workers = workers
+        selection = backend.select(products, regions, start, end)
+        selection.total()
+        selection.sum_by("المنتج")
+        selection.sum_by("المنطقة", "يوم_الأسبوع")
+
+    return time_workers("sql_filter", args.sql_rows, args.workers, args.repeat, run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس تسريع التجميع بالأجزاء الشهرية المتوازية")
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--sql-rows", type=int, default=5_000_000, help="صفوف مرحلة sql_filter (0 لتخطيها)")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--regions", type=int, default=20)
+    parser.add_argument("--days", type=int, default=4 * 365)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="ملف JSON لحفظ النتائج")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    print(f"rows={args.rows:,} sql_rows={args.sql_rows:,} cpus={cpus}")
+    if cpus < max(args.workers):
+        print(f"تنبيه: الأنوية المتاحة ({cpus}) أقل من أكبر عدد خيوط ({max(args.workers)})؛ التسريع المقيس محدود بها")
+
+    results = {"cpus": cpus, "cube_build": cube_build(args)}
+    if args.sql_rows:
+        with tempfile.TemporaryDirectory(prefix="parallel-aggregation-") as work_dir:
+            results["sql_filter"] = sql_filter(args, work_dir)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
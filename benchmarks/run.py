@@ -0,0 +1,185 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+from backends import open_backend  # noqa: E402
+from export import available_formats, write_export  # noqa: E402
+from generate import generate  # noqa: E402
+from shards import DASHBOARD_WORKERS, available_cpus  # noqa: E402
+
+# يقيس كل مرحلة من مراحل اللوحة (زمن الاستجابة، الصفوف في الثانية، ذروة الذاكرة)
+# ويحفظ النتائج في JSON لمقارنة الإصدارات
+
+
+def measure(func, repeat):
+    # التوقيت بدون tracemalloc ثم تشغيل إضافي واحد لقياس ذروة الذاكرة
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_size(rows, backend, args, work_dir, memory):
+    order = "shuffled" if args.shuffle else "sorted"
+    data_path = os.path.join(work_dir, f"sales-{rows}-{args.products}x{args.regions}x{args.days}-{args.seed}-{order}.csv")
+    if not os.path.exists(data_path):
+        generate(data_path, rows, args.products, args.regions, args.days, seed=args.seed, shuffle=args.shuffle)
+    cache_dir = os.path.join(work_dir, f"cache-{backend}-{rows}-{order}")
+
+    def cold_load():
+        # قراءة CSV وبناء كل الهياكل من الصفر
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        return pipeline.load(data_path, cache_dir, backend)
+
+    def warm_load():
+        # من المخزن العمودي المحفوظ دون إعادة تحليل CSV
+        return open_backend(data_path, cache_dir, backend).refresh()
+
+    stages = []
+
+    def stage(name, func, repeat=args.repeat, stage_rows=rows):
+        result, seconds, peak = measure(func, repeat)
+        best = min(seconds)
+        stages.append({
+            "rows": rows,
+            "backend": backend,
+            "stage": name,
+            "seconds": seconds,
+            "best": best,
+            "median": statistics.median(seconds),
+            "rows_per_second": stage_rows / best if best else None,
+            "peak_bytes": peak,
+        })
+        print(f"{backend:>7} {rows:>12,} {name:<22} {best:9.4f}s  peak={peak / 2**20:9.1f} MB", flush=True)
+        return result
+
+    stage("load_cold", cold_load, repeat=1)
+    view = stage("load_warm", warm_load)
+    if hasattr(view, "memory_report"):
+        # ذاكرة أعمدة الإطار مقارنة بالتمثيل النصي السابق
+        report = view.memory_report()
+        memory[str(rows)] = report.reset_index().to_dict("records")
+        print(f"{backend:>7} {rows:>12,} memory {report.loc['المجموع', 'after'] / 2**20:9.1f} MB"
+              f"  saved={report.loc['المجموع', 'saved'] / 2**20:9.1f} MB", flush=True)
+
+    products, regions, start, end = pipeline.default_filters(view)
+    # فلتر جزئي: نصف المنتجات وأول منطقتين وآخر ثلث الفترة
+    subset = (products[:max(1, len(products) // 2)], regions[:2], start + (end - start) * 2 / 3, end)
+    selection = stage("filter_all", lambda: pipeline.filter_rows(view, products, regions, start, end))
+    subset_selection = stage("filter_subset", lambda: pipeline.filter_rows(view, *subset))
+
+    total, by_day, by_product, by_region = stage("kpis", lambda: pipeline.kpis(selection))
+    stage("kpis_subset", lambda: pipeline.kpis(subset_selection))
+
+    def chart_frames():
+        return [
+            pipeline.time_frame(view, selection, regions, start, end, None, "يومي", 1800),
+            pipeline.time_frame(view, selection, regions, start, end, products[0], "أسبوعي", 1800),
+            pipeline.product_frame(by_product),
+            pipeline.region_frame(by_region),
+            pipeline.product_region_frame(selection),
+            pipeline.region_product_frame(selection),
+            pipeline.product_day_frame(selection),
+            pipeline.region_day_frame(selection),
+            pipeline.day_impact_frame(view, products[0], regions[0], start, end),
+        ]
+
+    stage("chart_frames", chart_frames)
+    stage("period_kpis", lambda: pipeline.period_kpis(pipeline.period_timeline(view, *subset[:2]), end))
+    stage("table_page", lambda: pipeline.filter_rows(view, *subset).table("", "الإيرادات", False).page(1, 50))
+    stage("table_search", lambda: subset_selection.table(regions[0][:2], "التاريخ", True).page(1, 50))
+
+    export_rows = len(subset_selection)
+    for export_format in available_formats():
+        def export(export_format=export_format):
+            with tempfile.TemporaryFile() as handle:
+                write_export(subset_selection, export_format, handle)
+                return handle.tell()
+        stage(f"export {export_format}", export, stage_rows=export_rows)
+    return stages
+
+
+def compare(baseline_path, results):
+    # نسبة الزمن الحالي إلى الزمن في ملف سابق لكل مرحلة (> 1 يعني أبطأ)
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = {(r["backend"], r["rows"], r["stage"]): r["best"] for r in json.load(handle)["results"]}
+    print("\nمقارنة مع", baseline_path)
+    for result in results:
+        before = baseline.get((result["backend"], result["rows"], result["stage"]))
+        if before:
+            ratio = result["best"] / before
+            flag = "  ⚠" if ratio > 1.1 else ""
+            print(f"{result['backend']:>7} {result['rows']:>12,} {result['stage']:<22} {ratio:6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مراحل لوحة المبيعات")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["pandas"])
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shuffle", action="store_true", help="بيانات غير مرتبة حسب التاريخ")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "dashboard-benchmarks"))
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="ملف نتائج سابق للمقارنة")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = []
+    memory = {}
+    for rows in args.sizes:
+        for backend in args.backends:
+            results.extend(run_size(rows, backend, args, args.work_dir, memory))
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": available_cpus(),
+        "workers": DASHBOARD_WORKERS,
+        # ذروة الذاكرة المقيمة للعملية كلها (كيلوبايت على لينكس)
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "parameters": {
+            "products": args.products, "regions": args.regions, "days": args.days,
+            "seed": args.seed, "repeat": args.repeat, "shuffle": args.shuffle,
+        },
+        "results": results,
+        "memory": memory,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2)
+    print("\nالنتائج في", args.output)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
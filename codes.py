@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+# تحويلات مشتركة بين المكعب وفهرس الصفوف والمجاميع التراكمية ومحركات SQL:
+# قيم الفلاتر إلى أكواد فئات، والتواريخ إلى أيام منذ 1970-01-01
+
+DAY_NS = 86_400 * 10**9
+
+
+def label_codes(index, values):
+    # مواقع القيم في index مرتبة ودون تكرار؛ القيم غير الموجودة تُتجاهل
+    positions = index.get_indexer(pd.Index(list(values), dtype=object))
+    return np.unique(positions[positions >= 0])
+
+
+def day_number(timestamp):
+    return int(timestamp.value // DAY_NS)
+
+
+def day_numbers(timestamps):
+    return pd.DatetimeIndex(timestamps).values.astype("datetime64[D]").astype(np.int64)
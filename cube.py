@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+from codes import day_numbers, label_codes
+from shards import map_shards, month_shards
+
+# ترتيب أيام الأسبوع بدءًا من الإثنين (مطابق لـ dayofweek في pandas)
+DAY_ORDER = ['الإثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
+
+
+class SalesCube:
+    # مكعب إيرادات كثيف (منتج × منطقة × تاريخ) مع عدد الصفوف لكل خلية.
+    # يوم الأسبوع مشتق من محور التاريخ فلا داعي لتخزينه كمحور مستقل.
+
+    def __init__(self, products, regions, dates, revenue, counts):
+        self.products = pd.Index(products)
+        self.regions = pd.Index(regions)
+        self.dates = pd.DatetimeIndex(dates)
+        self.weekdays = weekday_codes(self.dates)
+        self.revenue = revenue
+        self.counts = counts
+
+    @classmethod
+    def from_frame(cls, df):
+        products = pd.Categorical(df["المنتج"])
+        regions = pd.Categorical(df["المنطقة"])
+        dates = pd.Categorical(df["التاريخ"])
+        return cls.from_codes(
+            products.categories, regions.categories, dates.categories,
+            products.codes, regions.codes, dates.codes, df["الإيرادات"].to_numpy()
+        )
+
+    @classmethod
+    def from_codes(cls, products, regions, dates, product_codes, region_codes, date_codes, values):
+        # الأكواد تشير إلى مواقع الفئات المرتبة في products و regions و dates
+        shape = (len(products), len(regions), len(dates))
+        revenue, counts = _accumulate(shape, product_codes, region_codes, date_codes, values)
+        return cls(products, regions, dates, revenue, counts)
+
+    @classmethod
+    def from_sorted_codes(cls, products, regions, dates, product_codes, region_codes, date_codes, values, workers=None):
+        # مثل from_codes لصفوف مرتبة حسب التاريخ: كل شهر نطاق متصل من الصفوف ومن محور التاريخ،
+        # فتُجمّع الأشهر بالتوازي ويكتب كل جزء في شريحته من المكعب دون دمج
+        values = np.asarray(values)
+        shape = (len(products), len(regions), len(dates))
+        revenue = np.zeros(shape, dtype=np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64)
+        counts = np.zeros(shape, dtype=np.int32)
+        days = day_numbers(dates)
+        date_codes = np.asarray(date_codes)
+
+        def build(shard):
+            d0, d1 = days.searchsorted(shard[0]), days.searchsorted(shard[1])
+            r0, r1 = date_codes.searchsorted(d0), date_codes.searchsorted(d1)
+            revenue[..., d0:d1], counts[..., d0:d1] = _accumulate(
+                shape[:2] + (d1 - d0,), product_codes[r0:r1], region_codes[r0:r1],
+                date_codes[r0:r1] - d0, values[r0:r1]
+            )
+
+        if len(days):
+            map_shards(build, month_shards(days[0], days[-1]), workers)
+        return cls(products, regions, dates, revenue, counts)
+
+    def add_rows(self, dates, product_codes, region_codes, values):
+        # مكعب جديد يضم صفوفًا إضافية دون إعادة التجميع من البداية: يُمدّ محور التاريخ
+        # بالتواريخ الجديدة ثم تُضاف قيم الصفوف إلى خلاياها. المكعب الحالي لا يتغير
+        # لأن جلسات أخرى قد تقرأ منه
+        dates = pd.DatetimeIndex(dates)
+        all_dates = self.dates.union(dates.unique())
+        values = _revenue_values(values)
+        dtype = np.result_type(self.revenue.dtype, values.dtype)
+        shape = self.revenue.shape[:2] + (len(all_dates),)
+        revenue = np.zeros(shape, dtype=dtype)
+        counts = np.zeros(shape, dtype=self.counts.dtype)
+        old = all_dates.get_indexer(self.dates)
+        revenue[..., old] = self.revenue
+        counts[..., old] = self.counts
+        cells = (np.asarray(product_codes), np.asarray(region_codes), all_dates.get_indexer(dates))
+        np.add.at(revenue, cells, values.astype(dtype))
+        np.add.at(counts, cells, 1)
+        return SalesCube(self.products, self.regions, all_dates, revenue, counts)
+
+    def select(self, products, regions, start, end):
+        p_idx = label_codes(self.products, products)
+        r_idx = label_codes(self.regions, regions)
+        d0 = self.dates.searchsorted(start, side="left")
+        d1 = self.dates.searchsorted(end, side="right")
+        return CubeSelection(self, p_idx, r_idx, d0, max(d0, d1))
+
+
+class CubeSelection:
+    # شريحة من المكعب تطابق فلاتر المنتج والمنطقة والفترة الزمنية
+
+    def __init__(self, cube, p_idx, r_idx, d0, d1):
+        # نسخ من الخلايا والتسميات بدل مرجع إلى المكعب: الاختيار يُحفظ في ذاكرة النتائج
+        # ولا يجب أن يُبقي المكعب السابق في الذاكرة بعد تحديث البيانات
+        self.products = cube.products[p_idx]
+        self.regions = cube.regions[r_idx]
+        self.dates = cube.dates[d0:d1].copy(deep=True)
+        self.weekdays = cube.weekdays[d0:d1].copy()
+        grid = np.ix_(p_idx, r_idx)
+        self.revenue = cube.revenue[grid][..., d0:d1]
+        self.counts = cube.counts[grid][..., d0:d1]
+
+    @property
+    def nbytes(self):
+        labels = self.products.nbytes + self.regions.nbytes + self.dates.nbytes + self.weekdays.nbytes
+        return self.revenue.nbytes + self.counts.nbytes + labels
+
+    def total(self):
+        return self.revenue.sum()
+
+    def sum_by(self, *dims, week_order=False):
+        # مكافئ لـ groupby(list(dims))["الإيرادات"].sum() على الصفوف المفلترة:
+        # تظهر فقط المجموعات التي تحتوي على صفوف، بنفس ترتيب المفاتيح.
+        # مع week_order تأتي أيام الأسبوع بترتيب الأسبوع كفئات مرتبة بدل ترتيب أسمائها
+        revenue = self._reduce(self.revenue, dims, week_order)
+        present = self._reduce(self.counts, dims, week_order) > 0
+        positions = np.nonzero(present)
+        labels = [self._labels(dim, week_order)[pos] for dim, pos in zip(dims, positions)]
+        if len(dims) == 1:
+            index = pd.Index(labels[0], name=dims[0])
+        else:
+            index = pd.MultiIndex.from_arrays(labels, names=list(dims))
+        return pd.Series(revenue[positions], index=index, name="الإيرادات")
+
+    def _reduce(self, values, dims, week_order=False):
+        # ترتيب المحاور: منتج، منطقة، ثم تاريخ أو يوم أسبوع
+        if "يوم_الأسبوع" in dims:
+            values = self._by_weekday(values, week_order)
+        axes = {"المنتج": 0, "المنطقة": 1, "يوم_الأسبوع": 2, "التاريخ": 2}
+        keep = [axes[dim] for dim in dims]
+        summed = values.sum(axis=tuple(a for a in range(3) if a not in keep))
+        order = np.argsort(np.argsort(keep))
+        return np.transpose(summed, order) if summed.ndim > 1 else summed
+
+    def _by_weekday(self, values, week_order=False):
+        # تجميع محور التاريخ إلى أيام الأسبوع مرتبة أبجديًا كما يفعل groupby (أو بترتيب الأسبوع)
+        weekdays = self.weekdays
+        out = np.zeros(values.shape[:2] + (7,), dtype=values.dtype)
+        for slot, day in enumerate(range(7) if week_order else _WEEKDAY_SORT):
+            out[..., slot] = values[..., weekdays == day].sum(axis=-1)
+        return out
+
+    def _labels(self, dim, week_order=False):
+        if dim == "المنتج":
+            return self.products
+        if dim == "المنطقة":
+            return self.regions
+        if dim == "يوم_الأسبوع":
+            if week_order:
+                return pd.CategoricalIndex(weekday_labels(np.arange(7)))
+            return pd.Index([DAY_ORDER[day] for day in _WEEKDAY_SORT])
+        return self.dates
+
+
+# أرقام أيام الأسبوع مرتبة حسب أسمائها العربية (ترتيب مفاتيح groupby)
+_WEEKDAY_SORT = np.array(sorted(range(7), key=lambda day: DAY_ORDER[day]))
+
+
+def weekday_codes(dates):
+    # رقم يوم الأسبوع (الإثنين = 0) في بايت واحد
+    return np.asarray(pd.DatetimeIndex(dates).dayofweek, dtype=np.uint8)
+
+
+def weekday_labels(codes):
+    # الأسماء العربية تُطبّق عند العرض فقط، كفئات مرتبة بترتيب الأسبوع
+    return pd.Categorical.from_codes(np.asarray(codes, dtype=np.int8), categories=DAY_ORDER, ordered=True)
+
+
+def with_weekday(frame):
+    # عمود يوم الأسبوع لا يُخزن لكل صف؛ يُضاف لصفوف الجدول أو التحميل المعروضة فقط
+    return frame.assign(**{"يوم_الأسبوع": weekday_labels(weekday_codes(frame["التاريخ"]))})
+
+
+def _accumulate(shape, product_codes, region_codes, date_codes, values):
+    flat = np.ravel_multi_index(
+        (np.asarray(product_codes, dtype=np.int64), np.asarray(region_codes, dtype=np.int64), np.asarray(date_codes, dtype=np.int64)),
+        shape
+    )
+    values = _revenue_values(values)
+    size = int(np.prod(shape))
+    revenue = np.bincount(flat, weights=values, minlength=size).reshape(shape)
+    if np.issubdtype(values.dtype, np.integer):
+        revenue = np.rint(revenue).astype(np.int64)
+    counts = np.bincount(flat, minlength=size).astype(np.int32).reshape(shape)
+    return revenue, counts
+
+
+def _revenue_values(values):
+    # الإيرادات الناقصة (NaN) تُجمع كصفر كما في groupby().sum()، والصف يُحسب في عدد صفوف خليته
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return np.where(np.isnan(values), 0.0, values)
+    return values
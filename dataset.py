@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cube import DAY_ORDER, SalesCube
+from filters import RowIndex, sort_by_date
+from ingest import CHUNK_ROWS, source_signature, update_store
+from timeline import RevenueTimeline
+
+
+class SalesData:
+    # البيانات المحمّلة في الذاكرة (الإطار والمكعب وفهرس الصفوف والمجاميع التراكمية) مع تحديثها عند تغيّر الملف.
+    # كل تحديث ينشئ كائنات جديدة ولا يعدّل القديمة، فالجلسات التي تقرأ لقطة سابقة لا تتأثر
+
+    def __init__(self, path, cache_dir, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        store, _ = update_store(path, cache_dir, chunk_rows)
+        self._snapshot = self._build(store)
+
+    def snapshot(self):
+        # (df, cube, row_index, timeline, signature)
+        return self._snapshot
+
+    def refresh(self):
+        # فحص رخيص لتوقيع الملف في كل إعادة تشغيل؛ عند الإلحاق في نهاية الملف
+        # تُقرأ الصفوف الجديدة فقط وتُضاف إلى البيانات الحالية
+        if source_signature(self.path) == self._snapshot[4]:
+            return self._snapshot
+        with self._lock:
+            if source_signature(self.path) == self._snapshot[4]:
+                return self._snapshot
+            store, first_row = update_store(self.path, self.cache_dir, self.chunk_rows)
+            if first_row is not None and self._can_append(store, first_row):
+                self._snapshot = self._append(store, first_row)
+            else:
+                self._snapshot = self._build(store)
+            return self._snapshot
+
+    def _build(self, store):
+        df = sort_by_date(store.to_frame())
+        # مكعب الإيرادات المجمّعة يُبنى مرة واحدة وتُشتق منه كل المؤشرات والرسوم؛
+        # الصفوف مرتبة حسب التاريخ فيُبنى كل شهر بالتوازي
+        dates, date_codes = store.date_codes()
+        cube = SalesCube.from_sorted_codes(
+            store.products, store.regions, dates, df["المنتج"].array.codes, df["المنطقة"].array.codes,
+            date_codes[df.index.to_numpy()], df["الإيرادات"].to_numpy()
+        )
+        # فهرس الصفوف لفلترة سريعة دون بناء أقنعة منطقية على كامل البيانات
+        row_index = RowIndex.from_frame(df)
+        # المجاميع التراكمية اليومية من المكعب مباشرة (للمتوسطات المتحركة والمقارنة بين الفترات)
+        return df, cube, row_index, RevenueTimeline.from_cube(cube), store.signature
+
+    def _can_append(self, store, first_row):
+        # الإلحاق ممكن إذا لم تتغير الفئات ولا نوع الإيرادات، ولم تسبق التواريخ الجديدة
+        # آخر تاريخ محمّل (حتى يبقى الإطار مرتبًا حسب التاريخ)
+        df, cube = self._snapshot[:2]
+        if first_row != len(df) or len(df) == 0:
+            return False
+        if not (store.products.equals(cube.products) and store.regions.equals(cube.regions)):
+            return False
+        if store.revenue.dtype != df["الإيرادات"].dtype:
+            return False
+        if first_row == len(store):
+            return True
+        return pd.Timestamp(int(store.days[first_row:].min()), unit="D") >= df["التاريخ"].iloc[-1]
+
+    def _append(self, store, first_row):
+        df, cube, row_index, timeline, _ = self._snapshot
+        if first_row == len(store):
+            return df, cube, row_index, timeline, store.signature
+        added = sort_by_date(store.to_frame(first_row))
+        df = pd.concat([df, added])
+        products = added["المنتج"].array.codes
+        regions = added["المنطقة"].array.codes
+        cube = cube.add_rows(added["التاريخ"], products, regions, added["الإيرادات"].to_numpy())
+        row_index = row_index.append(added["التاريخ"].to_numpy(), products, regions, added.index)
+        return df, cube, row_index, RevenueTimeline.from_cube(cube), store.signature
+
+
+def memory_report(df, cube):
+    # ذاكرة كل عمود في الإطار الحالي مقارنة بالتمثيل القديم (astype(str) لكل صف للمنتج والمنطقة
+    # ويوم الأسبوع، و int64 للإيرادات)، بالبايت
+    rows = len(df)
+    # عدد الصفوف في كل يوم أسبوع من المكعب دون المرور على الصفوف
+    per_weekday = np.bincount(cube.weekdays, weights=cube.counts.sum(axis=(0, 1)), minlength=7)
+    before = {
+        "التاريخ": rows * 8,
+        "المنتج": _strings_bytes(df["المنتج"].value_counts(sort=False)),
+        "المنطقة": _strings_bytes(df["المنطقة"].value_counts(sort=False)),
+        "الإيرادات": rows * 8,
+        "يوم_الأسبوع": _strings_bytes(pd.Series(per_weekday, index=DAY_ORDER)),
+    }
+    after = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        "dtype": [str(df[column].dtype) if column in df else "-" for column in before],
+        "before": list(before.values()),
+        "after": [int(after.get(column, 0)) for column in before],
+    }, index=pd.Index(list(before), name="column"))
+    report.loc["المجموع"] = ["", report["before"].sum(), report["after"].sum()]
+    report["saved"] = report["before"] - report["after"]
+    return report
+
+
+def _strings_bytes(counts):
+    # تكلفة الصف لكل قيمة بنوع astype(str) الافتراضي (كائنات بايثون أو نصوص Arrow حسب إصدار pandas)
+    # تُقاس على سلسلة صغيرة ثم تُضرب في عدد صفوفها
+    total = 0
+    for label, count in counts.items():
+        one, two = (pd.Series([str(label)] * n).astype(str).memory_usage(index=False, deep=True) for n in (1, 2))
+        total += count * (two - one)
+    return int(total)
@@ -0,0 +1,66 @@
+import numpy as np
+
+# التجميع الزمني المتاح للرسم: الاسم المعروض ← تكرار pandas (None = يومي كما هو)
+ROLLUPS = {"يومي": None, "أسبوعي": "W-SUN", "شهري": "M"}
+
+# عدد البكسلات لكل نقطة عند حساب الحد الأقصى للنقاط من عرض الرسم
+PIXELS_PER_POINT = 2
+
+
+def target_points(width, pixels_per_point=PIXELS_PER_POINT):
+    return max(3, int(width) // pixels_per_point)
+
+
+def rollup(series, rollup_name):
+    # series: الإيرادات مفهرسة بالتاريخ (فترات موجودة فقط، مثل groupby)
+    freq = ROLLUPS[rollup_name]
+    if freq is None or series.empty:
+        return series
+    periods = series.index.to_period(freq).start_time
+    return series.groupby(periods).sum().rename_axis(series.index.name)
+
+
+def downsample(frame, x, y, target, method="lttb"):
+    if len(frame) <= target:
+        return frame
+    xs = frame[x].to_numpy().astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    ys = frame[y].to_numpy().astype(np.float64)
+    if method == "minmax":
+        keep = minmax_indices(ys, target)
+    else:
+        keep = lttb_indices(xs, ys, target)
+    return frame.iloc[keep]
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: يختار من كل مجموعة النقطة التي تشكل أكبر مثلث
+    # مع النقطة المختارة سابقًا ومتوسط المجموعة التالية
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, threshold):
+    # لكل مجموعة نحتفظ بأدنى وأعلى نقطة بترتيبهما الزمني، فتبقى القمم ظاهرة
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    keep = []
+    for bucket in np.array_split(np.arange(n), threshold // 2):
+        values = y[bucket]
+        keep.extend(sorted({bucket[values.argmin()], bucket[values.argmax()]}))
+    return np.asarray(keep, dtype=np.int64)
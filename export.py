@@ -0,0 +1,64 @@
+import gzip
+import importlib.util
+import tempfile
+
+EXPORT_CHUNK_ROWS = 100_000
+
+# صيغ التحميل: الاسم المعروض ← (امتداد الملف، نوع MIME)
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV مضغوط (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    # Parquet اختياري ويتطلب وجود pyarrow
+    formats = [name for name in EXPORT_FORMATS if name != "Parquet"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("Parquet")
+    return formats
+
+
+def write_csv(selection, handle, chunk_rows=EXPORT_CHUNK_ROWS):
+    # أجزاء متتالية من الصفوف المفلترة دون نسخ كامل البيانات دفعة واحدة
+    header = True
+    for frame in selection.frames(chunk_rows):
+        handle.write(frame.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+
+
+def write_parquet(selection, handle, chunk_rows=EXPORT_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for frame in selection.frames(chunk_rows):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(handle, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_export(selection, export_format, handle, chunk_rows=EXPORT_CHUNK_ROWS):
+    if export_format == "CSV":
+        write_csv(selection, handle, chunk_rows)
+    elif export_format == "CSV مضغوط (gzip)":
+        with gzip.GzipFile(fileobj=handle, mode="wb") as compressed:
+            write_csv(selection, compressed, chunk_rows)
+    elif export_format == "Parquet":
+        write_parquet(selection, handle, chunk_rows)
+    else:
+        raise ValueError(f"صيغة تحميل غير معروفة: {export_format}")
+
+
+def export_file(selection, export_format):
+    # يُكتب الملف على القرص جزءًا بجزء ثم يُعاد للقراءة من بدايته
+    handle = tempfile.TemporaryFile()
+    write_export(selection, export_format, handle)
+    handle.seek(0)
+    return handle
@@ -0,0 +1,38 @@
+import functools
+import os
+
+# الحد الأقصى لحجم الرسم بعد تحويله إلى JSON (بالكيلوبايت)، قابل للتعديل عبر متغيرات البيئة
+FIGURE_BUDGET_BYTES = int(os.environ.get("DASHBOARD_FIGURE_BUDGET_KB", "256")) * 1024
+# عند التفعيل يُمنع عرض الرسم الذي يتجاوز الحد بدل الاكتفاء بالتحذير
+FIGURE_BUDGET_STRICT = os.environ.get("DASHBOARD_FIGURE_BUDGET_STRICT", "0") == "1"
+
+
+class FigureBudgetExceeded(Exception):
+    def __init__(self, name, size, budget):
+        self.name = name
+        self.size = size
+        self.budget = budget
+        super().__init__(
+            f"حجم الرسم «{name}» ({size / 1024:,.0f} KB) يتجاوز الحد المسموح ({budget / 1024:,.0f} KB)"
+        )
+
+
+def figure_size(fig):
+    return len(fig.to_json().encode("utf-8"))
+
+
+def sized(build):
+    # دالة رسم تعيد (الرسم، حجمه): التحويل إلى JSON مرة واحدة عند البناء، ويُحفظ الحجم مع الرسم
+    # في ذاكرة النتائج فلا يُعاد في كل إعادة تشغيل
+    @functools.wraps(build)
+    def wrapper(*args):
+        fig = build(*args)
+        return fig, figure_size(fig)
+    return wrapper
+
+
+def check_figure(size, name, budget=None):
+    budget = FIGURE_BUDGET_BYTES if budget is None else budget
+    if size > budget:
+        raise FigureBudgetExceeded(name, size, budget)
+    return size
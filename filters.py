@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+from codes import label_codes
+
+
+def sort_by_date(df):
+    # ترتيب مستقر حسب التاريخ مع الحفاظ على أرقام الصفوف الأصلية
+    dates = df["التاريخ"].to_numpy()
+    if len(dates) < 2 or (dates[1:] >= dates[:-1]).all():
+        return df
+    return df.take(np.argsort(dates, kind="stable"))
+
+
+class RowIndex:
+    # فهرس فلترة على إطار مرتب حسب التاريخ: نطاق التاريخ يصبح شريحة عبر searchsorted،
+    # ولكل منتج ولكل منطقة قائمة مرتبة بأرقام صفوفه (مواقع وليست تسميات).
+    # row_numbers أرقام الصفوف في الملف لكل موضع، أو None إن كان الترتيب حسب التاريخ هو ترتيب الملف نفسه
+
+    def __init__(self, dates, products, regions, product_codes, region_codes, row_numbers=None):
+        self.dates = dates
+        self.products = pd.Index(products)
+        self.regions = pd.Index(regions)
+        self.product_codes = product_codes
+        self.region_codes = region_codes
+        self.row_numbers = row_numbers
+        self.product_rows = _rows_per_code(product_codes, len(self.products))
+        self.region_rows = _rows_per_code(region_codes, len(self.regions))
+        # أول رقم صف في الملف لكل فئة (لترتيب الخيارات كما تعيدها unique() على الملف)
+        self.product_first = _first_rows(product_codes, row_numbers, len(self.products))
+        self.region_first = _first_rows(region_codes, row_numbers, len(self.regions))
+
+    @classmethod
+    def from_frame(cls, df):
+        products = df["المنتج"].array
+        regions = df["المنطقة"].array
+        return cls(
+            df["التاريخ"].to_numpy(), products.categories, regions.categories,
+            products.codes, regions.codes, _row_numbers(df.index, 0)
+        )
+
+    def __len__(self):
+        return len(self.dates)
+
+    def append(self, dates, product_codes, region_codes, rows):
+        # فهرس جديد بعد إلحاق صفوف تواريخها لا تسبق آخر تاريخ (rows أرقامها في الملف)؛ مواقعها تلي
+        # الصفوف الحالية فتُضاف إلى نهاية قائمة كل فئة وتبقى القوائم مرتبة
+        index = RowIndex.__new__(RowIndex)
+        index.dates = np.concatenate([self.dates, dates])
+        index.products = self.products
+        index.regions = self.regions
+        index.product_codes = np.concatenate([self.product_codes, product_codes])
+        index.region_codes = np.concatenate([self.region_codes, region_codes])
+        in_file_order = self.row_numbers is None and _row_numbers(rows, len(self)) is None
+        rows = np.asarray(rows, dtype=np.int64)
+        if in_file_order:
+            index.row_numbers = None
+        else:
+            current = np.arange(len(self)) if self.row_numbers is None else self.row_numbers
+            index.row_numbers = np.concatenate([current, rows])
+        index.product_rows = _extend_rows(self.product_rows, product_codes, len(self))
+        index.region_rows = _extend_rows(self.region_rows, region_codes, len(self))
+        index.product_first = np.minimum(self.product_first, _first_rows(product_codes, rows, len(self.products)))
+        index.region_first = np.minimum(self.region_first, _first_rows(region_codes, rows, len(self.regions)))
+        return index
+
+    def first_appearance(self, dimension):
+        # كل الفئات الموجودة في البيانات بترتيب أول ظهور لها في الملف
+        if dimension == "المنتج":
+            return self.products[_by_first_row(self.product_first)]
+        return self.regions[_by_first_row(self.region_first)]
+
+    def appearance_order(self, selection, labels, dimension):
+        # ترتيب الفئات حسب أول ظهور لها في الصفوف المفلترة كما تعيدها unique() على الملف
+        if dimension == "المنتج":
+            index, codes = self.products, self.product_codes
+        else:
+            index, codes = self.regions, self.region_codes
+        wanted = set(index.get_indexer(pd.Index(labels)).tolist())
+        if self.row_numbers is not None:
+            # الصفوف أُعيد ترتيبها حسب التاريخ: أصغر رقم صف لكل فئة على كل الصفوف المفلترة
+            first = np.full(len(index), _NO_ROW)
+            for start in range(0, len(selection), _SCAN_ROWS):
+                ids = selection.segment(start, start + _SCAN_ROWS)
+                np.minimum.at(first, codes[ids], self.row_numbers[ids])
+            return index[[code for code in _by_first_row(first) if code in wanted]]
+        # المواقع بترتيب الملف: التوقف بمجرد العثور على كل الفئات بدل مسح كل الصفوف
+        seen = []
+        start, window = 0, 1024
+        while len(seen) < len(wanted) and start < len(selection):
+            for code in pd.unique(codes[selection.segment(start, start + window)]):
+                if code in wanted and code not in seen:
+                    seen.append(code)
+            start += window
+            window *= 2
+        return index[seen]
+
+    def _as_date(self, value):
+        return pd.Timestamp(value).to_datetime64().astype(self.dates.dtype)
+
+    def select(self, products, regions, start, end):
+        lo = int(self.dates.searchsorted(self._as_date(start), side="left"))
+        hi = max(lo, int(self.dates.searchsorted(self._as_date(end), side="right")))
+        p_codes = label_codes(self.products, products)
+        r_codes = label_codes(self.regions, regions)
+        all_products = len(p_codes) == len(self.products)
+        all_regions = len(r_codes) == len(self.regions)
+
+        if all_products and all_regions:
+            return RowSelection(lo, hi)
+        if len(p_codes) == 0 or len(r_codes) == 0:
+            return RowSelection(lo, lo)
+
+        # نبدأ من البُعد الأقل صفوفًا داخل النطاق، ثم نتحقق من البُعد الآخر عبر جدول أكواده
+        p_size = _size_in_range(self.product_rows, p_codes, lo, hi)
+        r_size = _size_in_range(self.region_rows, r_codes, lo, hi)
+        if all_regions or (not all_products and p_size <= r_size):
+            ids = _union_in_range(self.product_rows, p_codes, lo, hi)
+            if not all_regions:
+                ids = ids[_membership(r_codes, len(self.regions))[self.region_codes[ids]]]
+        else:
+            ids = _union_in_range(self.region_rows, r_codes, lo, hi)
+            if not all_products:
+                ids = ids[_membership(p_codes, len(self.products))[self.product_codes[ids]]]
+        return RowSelection(lo, hi, ids)
+
+
+class RowSelection:
+    # نتيجة الفلترة: إما شريحة متصلة [start, stop) أو مصفوفة أرقام صفوف مرتبة
+
+    def __init__(self, start, stop, ids=None):
+        self.start = start
+        self.stop = stop
+        self._ids = ids
+
+    def __len__(self):
+        return self.stop - self.start if self._ids is None else len(self._ids)
+
+    @property
+    def nbytes(self):
+        return 0 if self._ids is None else self._ids.nbytes
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            return np.arange(self.start, self.stop)
+        return self._ids
+
+    def segment(self, start, stop):
+        # أرقام الصفوف من الموضع start إلى stop داخل الاختيار
+        if self._ids is None:
+            return np.arange(self.start + start, min(self.start + stop, self.stop))
+        return self._ids[start:stop]
+
+    def contains(self, positions):
+        # قناع للمواقع التي تقع داخل الاختيار
+        inside = (positions >= self.start) & (positions < self.stop)
+        if self._ids is None:
+            return inside
+        if len(self._ids) == 0:
+            return np.zeros(len(positions), dtype=bool)
+        at = np.minimum(self._ids.searchsorted(positions), len(self._ids) - 1)
+        return inside & (self._ids[at] == positions)
+
+    def take(self, df):
+        if self._ids is None:
+            return df.iloc[self.start:self.stop]
+        return df.iloc[self._ids]
+
+
+# قيمة "لا يوجد صف" لأول ظهور، وحجم أجزاء المسح عند حسابه
+_NO_ROW = np.iinfo(np.int64).max
+_SCAN_ROWS = 1 << 20
+
+
+def _row_numbers(index, offset):
+    # أرقام الصفوف في الملف، أو None إن كانت متتالية من offset (الإطار بترتيب الملف)
+    if isinstance(index, pd.RangeIndex) and index.step == 1 and (index.start == offset or len(index) == 0):
+        return None
+    return np.asarray(index, dtype=np.int64)
+
+
+def _first_rows(codes, row_numbers, size):
+    # أصغر رقم صف لكل كود (_NO_ROW للفئات الغائبة)؛ row_numbers=None تعني أن الأرقام هي المواقع
+    first = np.full(size, _NO_ROW)
+    for start in range(0, len(codes), _SCAN_ROWS):
+        stop = min(start + _SCAN_ROWS, len(codes))
+        rows = np.arange(start, stop) if row_numbers is None else row_numbers[start:stop]
+        np.minimum.at(first, codes[start:stop], rows)
+    return first
+
+
+def _by_first_row(first):
+    present = np.flatnonzero(first != _NO_ROW)
+    return present[np.argsort(first[present], kind="stable")].tolist()
+
+
+def _rows_per_code(codes, size):
+    codes = np.asarray(codes)
+    dtype = np.int32 if len(codes) < 2 ** 31 else np.int64
+    order = np.argsort(codes, kind="stable").astype(dtype)
+    bounds = np.cumsum(np.bincount(codes, minlength=size))
+    return np.split(order, bounds[:-1])
+
+
+def _extend_rows(rows, codes, offset):
+    dtype = np.int32 if offset + len(codes) < 2 ** 31 else np.int64
+    added = _rows_per_code(codes, len(rows))
+    return [np.concatenate([old, new + offset]).astype(dtype, copy=False) for old, new in zip(rows, added)]
+
+
+def _membership(codes, size):
+    mask = np.zeros(size, dtype=bool)
+    mask[codes] = True
+    return mask
+
+
+def _size_in_range(rows, codes, lo, hi):
+    return sum(int(rows[c].searchsorted(hi) - rows[c].searchsorted(lo)) for c in codes)
+
+
+def _union_in_range(rows, codes, lo, hi):
+    parts = [rows[c][rows[c].searchsorted(lo):rows[c].searchsorted(hi)] for c in codes]
+    ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+    # القوائم منفصلة (كل صف ينتمي لفئة واحدة)، فيكفي الترتيب دون إزالة التكرار
+    if len(parts) > 1:
+        ids.sort()
+    return ids
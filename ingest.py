@@ -0,0 +1,363 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # ويندوز: بلا قفل بين العمليات
+    fcntl = None
+
+CHUNK_ROWS = 500_000
+CACHE_VERSION = 3
+
+# أعمدة المخزن العمودي: اسم الملف ونوع البيانات على القرص
+CODE_DTYPE = np.int32
+DAY_DTYPE = np.int32
+COLUMN_FILES = ("product_codes", "region_codes", "days", "revenue")
+
+# حجم الكتلة التي تُقارن عند حدود الملف للتأكد من أن الإضافة في النهاية فقط
+BOUNDARY_BYTES = 64 * 1024
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextmanager
+def store_lock(cache_dir):
+    # قفل حصري بين العمليات (عمال Streamlit أو حاويات تتشارك مجلد الكاش) لكل ما يكتب فيه.
+    # ملف القفل بجانب المجلد لا داخله لأن القراءة الكاملة تستبدل المجلد، والخيط الذي يحمل
+    # القفل يستطيع طلبه مرة أخرى (محرك SQL يحمله أثناء update_store ثم تحديث قاعدته)
+    path = os.path.abspath(cache_dir) + ".lock"
+    held = _held.__dict__.setdefault("paths", set())
+    if fcntl is None or path in held:
+        yield
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+_held = threading.local()
+
+
+class ColumnStore:
+    # بيانات المبيعات بعد التحويل: أكواد للمنتج والمنطقة، التاريخ كعدد أيام منذ 1970-01-01،
+    # وكل عمود محفوظ في ملف ثنائي مستقل يُفتح عبر memory-map
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.products = pd.Index(meta["products"], dtype=object)
+        self.regions = pd.Index(meta["regions"], dtype=object)
+        self.product_codes = self._column("product_codes")
+        self.region_codes = self._column("region_codes")
+        self.days = self._column("days")
+        self.revenue = self._column("revenue")
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def signature(self):
+        return self.meta["source"]["mtime_ns"], self.meta["source"]["size"]
+
+    def _column(self, name):
+        dtype = np.dtype(self.meta["columns"][name])
+        if self.meta["rows"] == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, name + ".bin"), dtype=dtype, mode="r", shape=(self.meta["rows"],))
+
+    def date_codes(self):
+        # التواريخ الفريدة مرتبة، ورقم كل صف داخلها (بدون فرز الصفوف)
+        if len(self) == 0:
+            return pd.DatetimeIndex([]), np.empty(0, dtype=np.int64)
+        first = int(self.days.min())
+        offsets = self.days.astype(np.int64) - first
+        present = np.bincount(offsets) > 0
+        lookup = np.cumsum(present) - 1
+        dates = pd.to_datetime(np.flatnonzero(present) + first, unit="D")
+        return dates, lookup[offsets]
+
+    def to_frame(self, start=0):
+        # الصفوف من start حتى النهاية، مع الحفاظ على أرقامها في الملف كفهرس.
+        # المنتج والمنطقة أكواد فئات، والإيرادات بأصغر نوع يسعها؛ ويوم الأسبوع
+        # لا يُخزن لكل صف بل يُشتق من التاريخ عند العرض (cube.with_weekday)
+        return pd.DataFrame({
+            "التاريخ": pd.to_datetime(self.days[start:], unit="D"),
+            "المنتج": pd.Categorical.from_codes(self.product_codes[start:], categories=self.products),
+            "المنطقة": pd.Categorical.from_codes(self.region_codes[start:], categories=self.regions),
+            "الإيرادات": np.asarray(self.revenue[start:]),
+        }, index=pd.RangeIndex(start, len(self)))
+
+
+def load_store(path, cache_dir, chunk_rows=CHUNK_ROWS):
+    return update_store(path, cache_dir, chunk_rows)[0]
+
+
+def update_store(path, cache_dir, chunk_rows=CHUNK_ROWS):
+    # يعيد (المخزن، رقم أول صف جديد). الرقم None يعني أن الملف أُعيدت قراءته بالكامل؛
+    # وعند إلحاق صفوف في نهاية الملف تُقرأ الإضافة فقط وتُلحق بالمخزن الحالي
+    with store_lock(cache_dir):
+        return _update_store(path, cache_dir, chunk_rows)
+
+
+def _update_store(path, cache_dir, chunk_rows):
+    meta = _read_meta(cache_dir)
+    if meta is not None and meta.get("version") == CACHE_VERSION:
+        if _is_current(meta, path, cache_dir):
+            return ColumnStore(cache_dir, meta), meta["rows"]
+        offset = _append_offset(meta, path)
+        if offset is not None:
+            first_row = meta["rows"]
+            return ColumnStore(cache_dir, append_csv(path, cache_dir, meta, offset, chunk_rows)), first_row
+    return ColumnStore(cache_dir, ingest_csv(path, cache_dir, chunk_rows)), None
+
+
+def ingest_csv(path, cache_dir, chunk_rows=CHUNK_ROWS):
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".ingest-")
+    try:
+        meta = _ingest_into(path, staging, chunk_rows)
+        _swap_directory(staging, cache_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def append_csv(path, cache_dir, meta, offset, chunk_rows=CHUNK_ROWS):
+    # إزالة أي بقايا إضافة سابقة لم تكتمل قبل الكتابة في نهاية الأعمدة
+    for name in COLUMN_FILES:
+        with open(os.path.join(cache_dir, name + ".bin"), "ab") as handle:
+            handle.truncate(meta["rows"] * np.dtype(meta["columns"][name]).itemsize)
+
+    products = {label: code for code, label in enumerate(meta["products"])}
+    regions = {label: code for code, label in enumerate(meta["regions"])}
+    revenue_dtype = np.dtype(meta["columns"]["revenue"])
+    with open(path, "rb") as source:
+        source.seek(offset)
+        try:
+            reader = pd.read_csv(
+                source, header=None, names=meta["header"], chunksize=chunk_rows,
+                dtype={"المنتج": str, "المنطقة": str}
+            )
+        except pd.errors.EmptyDataError:
+            # الإضافة أسطر فارغة فقط
+            reader = []
+        rows, revenue_dtype = _write_chunks(reader, cache_dir, products, regions, revenue_dtype)
+
+    size = source_signature(path)[1]
+    meta = dict(meta, rows=meta["rows"] + rows)
+    meta["source"] = dict(meta["source"], segments=meta["source"]["segments"] + [_segment(path, offset, size)])
+    _finish_meta(path, cache_dir, meta, products, regions, revenue_dtype)
+    return meta
+
+
+def _ingest_into(path, directory, chunk_rows):
+    products, regions = {}, {}
+    reader = pd.read_csv(path, chunksize=chunk_rows, dtype={"المنتج": str, "المنطقة": str})
+    rows, revenue_dtype = _write_chunks(reader, directory, products, regions, None)
+    meta = {
+        "version": CACHE_VERSION,
+        "header": pd.read_csv(path, nrows=0).columns.tolist(),
+        "rows": rows,
+        "source": {"segments": [_segment(path, 0, source_signature(path)[1])]},
+    }
+    head_end = min(meta["source"]["segments"][0]["end"], BOUNDARY_BYTES)
+    meta["source"]["head"] = {"end": head_end, "sha256": _hash_range(path, 0, head_end)}
+    _finish_meta(path, directory, meta, products, regions, revenue_dtype or np.dtype(np.int64))
+    return meta
+
+
+def _write_chunks(reader, directory, products, regions, revenue_dtype):
+    # تحويل الأجزاء وكتابتها في نهاية ملفات الأعمدة؛ يعيد عدد الصفوف المكتوبة ونوع الإيرادات
+    rows = 0
+    revenue_file = os.path.join(directory, "revenue.bin")
+    files = {name: open(os.path.join(directory, name + ".bin"), "ab") for name in COLUMN_FILES}
+    try:
+        for chunk in reader:
+            files["product_codes"].write(_encode(chunk["المنتج"], products).tobytes())
+            files["region_codes"].write(_encode(chunk["المنطقة"], regions).tobytes())
+            days = pd.to_datetime(chunk["التاريخ"]).to_numpy().astype("datetime64[D]").astype(DAY_DTYPE)
+            files["days"].write(days.tobytes())
+
+            values = chunk["الإيرادات"].to_numpy()
+            if revenue_dtype is None:
+                revenue_dtype = _revenue_dtype(values)
+            elif np.promote_types(revenue_dtype, _revenue_dtype(values)) != revenue_dtype:
+                # ظهرت قيم أكبر أو عشرية بعد أجزاء أصغر: نحوّل ما كُتب سابقًا
+                files["revenue"].close()
+                wider = np.promote_types(revenue_dtype, _revenue_dtype(values))
+                _promote_column(revenue_file, revenue_dtype, wider)
+                files["revenue"] = open(revenue_file, "ab")
+                revenue_dtype = wider
+            files["revenue"].write(values.astype(revenue_dtype).tobytes())
+            rows += len(chunk)
+    finally:
+        for handle in files.values():
+            handle.close()
+    return rows, revenue_dtype
+
+
+def _finish_meta(path, directory, meta, products, regions, revenue_dtype):
+    meta["products"] = _sort_codes(os.path.join(directory, "product_codes.bin"), products, meta["rows"])
+    meta["regions"] = _sort_codes(os.path.join(directory, "region_codes.bin"), regions, meta["rows"])
+    meta["columns"] = {
+        "product_codes": np.dtype(CODE_DTYPE).str,
+        "region_codes": np.dtype(CODE_DTYPE).str,
+        "days": np.dtype(DAY_DTYPE).str,
+        "revenue": np.dtype(revenue_dtype).str,
+    }
+    mtime_ns, size = source_signature(path)
+    meta["source"].update(mtime_ns=mtime_ns, size=size)
+    _write_meta(directory, meta)
+
+
+def _encode(values, mapping):
+    # ترميز القيم بأكواد عامة ثابتة عبر كل الأجزاء (بترتيب الظهور)
+    codes, uniques = pd.factorize(values.fillna("nan").astype(str))
+    lookup = np.array([mapping.setdefault(label, len(mapping)) for label in uniques], dtype=CODE_DTYPE)
+    return lookup[codes]
+
+
+def _sort_codes(filename, mapping, rows):
+    # إعادة ترقيم الأكواد بحيث تكون الفئات مرتبة أبجديًا كما في pd.Categorical
+    labels = sorted(mapping)
+    remap = np.empty(len(mapping), dtype=CODE_DTYPE)
+    for new_code, label in enumerate(labels):
+        remap[mapping[label]] = new_code
+    if rows and not np.array_equal(remap, np.arange(len(remap))):
+        _rewrite_column(filename, CODE_DTYPE, rows, lambda codes: remap[codes])
+    return labels
+
+
+def _revenue_dtype(values):
+    # الإيرادات الصحيحة بأصغر نوع يسع قيم الجزء (int16 أو int32 أو int64)
+    if np.issubdtype(values.dtype, np.integer):
+        if len(values) == 0:
+            return np.dtype(np.int16)
+        low, high = values.min(), values.max()
+        for dtype in (np.int16, np.int32):
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+    return np.dtype(np.float64)
+
+
+def _promote_column(filename, old_dtype, new_dtype):
+    rows = os.path.getsize(filename) // np.dtype(old_dtype).itemsize
+    _rewrite_column(filename, old_dtype, rows, lambda values: values.astype(new_dtype))
+
+
+def _rewrite_column(filename, dtype, rows, convert):
+    # كتابة العمود المحوّل في ملف جديد ثم استبداله: العمليات التي فتحت الملف السابق عبر
+    # memory-map تبقى تقرأ نسخة كاملة بدل أكواد نصف محوّلة
+    if rows:
+        values = np.memmap(filename, dtype=dtype, mode="r", shape=(rows,))
+        with open(filename + ".tmp", "wb") as handle:
+            for start in range(0, rows, CHUNK_ROWS):
+                handle.write(convert(np.asarray(values[start:start + CHUNK_ROWS])).tobytes())
+        del values
+    else:
+        open(filename + ".tmp", "wb").close()
+    os.replace(filename + ".tmp", filename)
+
+
+def _hash_range(path, start, end, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = handle.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _segment(path, start, end):
+    # كل قراءة (كاملة أو إضافة) تُسجَّل كمقطع بايتات مع بصمته وبصمة آخر كتلة فيه
+    return {
+        "start": start,
+        "end": end,
+        "sha256": _hash_range(path, start, end),
+        "tail_sha256": _hash_range(path, max(start, end - BOUNDARY_BYTES), end),
+    }
+
+
+def _is_current(meta, path, cache_dir):
+    mtime_ns, size = source_signature(path)
+    source = meta["source"]
+    if source["size"] != size:
+        return False
+    if source["mtime_ns"] == mtime_ns:
+        return True
+    # تغيّر وقت التعديل فقط: نتحقق من المحتوى قبل إعادة القراءة
+    if any(_hash_range(path, seg["start"], seg["end"]) != seg["sha256"] for seg in source["segments"]):
+        return False
+    source["mtime_ns"] = mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+def _append_offset(meta, path):
+    # إضافة في نهاية الملف فقط: الحجم زاد، والملف السابق ينتهي بسطر كامل،
+    # وبداية الملف وآخر كتلة قبل الإضافة لم تتغيرا
+    size = source_signature(path)[1]
+    head, last = meta["source"]["head"], meta["source"]["segments"][-1]
+    offset = last["end"]
+    if size <= offset or offset == 0:
+        return None
+    with open(path, "rb") as handle:
+        handle.seek(offset - 1)
+        if handle.read(1) != b"\n":
+            return None
+    if _hash_range(path, 0, head["end"]) != head["sha256"]:
+        return None
+    if _hash_range(path, max(last["start"], offset - BOUNDARY_BYTES), offset) != last["tail_sha256"]:
+        return None
+    return offset
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    filename = os.path.join(directory, "meta.json")
+    with open(filename + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, ensure_ascii=False)
+    os.replace(filename + ".tmp", filename)
+
+
+def _swap_directory(staging, target):
+    if os.path.isdir(target):
+        retired = staging + ".old"
+        os.replace(target, retired)
+        os.replace(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.replace(staging, target)
@@ -0,0 +1,116 @@
+from backends import DASHBOARD_BACKEND, open_backend
+from downsample import downsample, rollup, target_points
+from export import export_file
+from timeline import MONTH_DAYS, WEEK_DAYS
+
+# مراحل اللوحة كدوال مستقلة عن Streamlit: التحميل، الفلترة، المؤشرات، بيانات الرسوم، والتحميل.
+# app.py يغلفها بذاكرة النتائج، وأدوات القياس تستدعيها مباشرة
+
+
+def load(path, cache_dir, backend=DASHBOARD_BACKEND):
+    return open_backend(path, cache_dir, backend).refresh()
+
+
+def default_filters(view):
+    # كل المنتجات والمناطق وكامل الفترة كما تظهر عند فتح اللوحة
+    start, end = view.date_range()
+    return list(view.products()), list(view.regions()), start, end
+
+
+def filter_rows(view, products, regions, start, end):
+    return view.select(products, regions, start, end)
+
+
+def kpis(selection):
+    # (إجمالي الإيرادات، حسب يوم الأسبوع، حسب المنتج، حسب المنطقة)
+    return (
+        selection.total(),
+        selection.sum_by("يوم_الأسبوع"),
+        selection.sum_by("المنتج"),
+        selection.sum_by("المنطقة"),
+    )
+
+
+def time_frame(view, selection, regions, start, end, selected_product, rollup_name, width):
+    if selected_product is None:
+        # حساب الإيرادات الكلية حسب التاريخ
+        time_series = selection.sum_by("التاريخ")
+    else:
+        # إيرادات المنتج المختار مجمّعة حسب التاريخ ضمن المناطق المختارة
+        time_series = view.select([selected_product], regions, start, end).sum_by("التاريخ")
+    return downsample(rollup(time_series, rollup_name).reset_index(), "التاريخ", "الإيرادات", target_points(width))
+
+
+def extremes(series):
+    # ((الاسم الأعلى، قيمته)، (الاسم الأقل، قيمته)) لمؤشرات الأعلى والأقل؛ (None, None) إن كانت فارغة
+    if series.empty:
+        return None, None
+    return (series.idxmax(), series.max()), (series.idxmin(), series.min())
+
+
+def period_timeline(view, products, regions):
+    return view.timeline().select(products, regions)
+
+
+def period_kpis(timeline, end):
+    # حتى نهاية الفترة المختارة: (المتوسط اليومي لآخر 7 أيام، (إيرادات آخر 7 أيام، نسبة التغير)،
+    # (إيرادات آخر 30 يومًا، نسبة التغير)، الإجمالي التراكمي منذ بداية البيانات)
+    return (
+        timeline.moving_average(end, WEEK_DAYS),
+        timeline.change(end, WEEK_DAYS),
+        timeline.change(end, MONTH_DAYS),
+        timeline.cumulative(end),
+    )
+
+
+def time_overlays(time_data, timeline, rollup_name, start, end):
+    # المتوسط المتحرك والإجمالي التراكمي عند نقاط الرسم فقط (بعد تقليلها)
+    moving, cumulative = timeline.rolling(time_data["التاريخ"], rollup_name, start, end)
+    return time_data.assign(**{"المتوسط المتحرك": moving, "الإجمالي التراكمي": cumulative})
+
+
+def product_frame(product_series):
+    return product_series.reset_index()
+
+
+def region_frame(region_series):
+    return region_series.reset_index().sort_values(by="الإيرادات")  # ترتيب من الصغير إلى الكبير
+
+
+def product_region_frame(selection):
+    return selection.sum_by("المنتج", "المنطقة").reset_index()
+
+
+def region_product_frame(selection):
+    return selection.sum_by("المنطقة", "المنتج").reset_index().sort_values(by="الإيرادات")
+
+
+def product_day_frame(selection):
+    return selection.sum_by("المنتج", "يوم_الأسبوع", week_order=True).reset_index()
+
+
+def region_day_frame(selection):
+    return selection.sum_by("المنطقة", "يوم_الأسبوع", week_order=True).reset_index()
+
+
+def day_impact_frame(view, selected_product, selected_region, start, end):
+    # أيام الأسبوع تأتي مرتبة بترتيب الأسبوع مباشرة من التجميع
+    selection = view.select([selected_product], [selected_region], start, end)
+    return selection.sum_by("يوم_الأسبوع", week_order=True).reset_index()
+
+
+def day_impact_stats(analysis_df):
+    # المتوسط واليوم الأعلى والأقل ونسبتهما من المتوسط؛ None إن لم توجد بيانات
+    if analysis_df.empty:
+        return None
+    avg_sales = analysis_df["الإيرادات"].mean()
+    max_day = analysis_df.loc[analysis_df["الإيرادات"].idxmax()]
+    min_day = analysis_df.loc[analysis_df["الإيرادات"].idxmin()]
+    max_percentage = ((max_day["الإيرادات"] - avg_sales) / avg_sales * 100) if avg_sales > 0 else 0
+    min_percentage = ((avg_sales - min_day["الإيرادات"]) / avg_sales * 100) if avg_sales > 0 else 0
+    return avg_sales, max_day, min_day, max_percentage, min_percentage
+
+
+def export(selection, export_format):
+    return export_file(selection, export_format)
+
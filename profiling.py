@@ -0,0 +1,187 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from result_cache import RESULT_CACHE
+
+# لوحة الأداء تظهر عند DASHBOARD_DEBUG=1 أو بإضافة ?debug=1 إلى رابط اللوحة
+DASHBOARD_DEBUG = os.environ.get("DASHBOARD_DEBUG", "0") == "1"
+# مسار ملف تُكتب فيه كل إعادة تشغيل كسطر JSON (اختياري)
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG")
+
+# حدود فئات المدرج التكراري لأزمنة المراحل (بالثواني)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LOGGER = logging.getLogger("dashboard.profile")
+if PROFILE_LOG:
+    _handler = logging.FileHandler(PROFILE_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+
+
+class RerunProfile:
+    # المراحل المسجلة في إعادة تشغيل واحدة للسكربت: الاسم والزمن وعدد الصفوف والبايتات
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = []
+        self.seconds = None
+
+    @contextmanager
+    def stage(self, name, rows=None, nbytes=None):
+        record = {"stage": name, "seconds": 0.0, "rows": rows, "bytes": nbytes}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.stages.append(record)
+
+    def finish(self, metrics=None):
+        metrics = METRICS if metrics is None else metrics
+        self.seconds = time.time() - self.started
+        metrics.observe_rerun(self)
+        # المراحل بعد انتهاء إعادة التشغيل تُسجل مباشرة في الإحصائيات
+        if current() is self:
+            _current.profile = None
+        if LOGGER.isEnabledFor(logging.INFO):
+            LOGGER.info(json.dumps(self.to_dict(), ensure_ascii=False))
+        return self
+
+    def to_dict(self):
+        return {"started": self.started, "seconds": self.seconds, "stages": self.stages}
+
+
+class MetricsRegistry:
+    # إحصائيات المراحل المتراكمة على مستوى العملية عبر كل الجلسات
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+
+    def observe(self, name, seconds, rows=None, nbytes=None):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = {
+                    "count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes": 0,
+                    "buckets": [0] * len(self.buckets),
+                }
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rows"] += rows or 0
+            stats["bytes"] += nbytes or 0
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats["buckets"][position] += 1
+
+    def observe_rerun(self, profile):
+        for record in profile.stages:
+            self.observe(record["stage"], record["seconds"], record["rows"], record["bytes"])
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += profile.seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "reruns": self.reruns,
+                "rerun_seconds": self.rerun_seconds,
+                "stages": {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self._stages.items()},
+            }
+
+    def prometheus(self):
+        # صيغة نصية يقرؤها Prometheus مباشرة
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP dashboard_reruns_total Script reruns completed.",
+            "# TYPE dashboard_reruns_total counter",
+            f"dashboard_reruns_total {snapshot['reruns']}",
+            "# HELP dashboard_rerun_seconds_total Time spent in script reruns.",
+            "# TYPE dashboard_rerun_seconds_total counter",
+            f"dashboard_rerun_seconds_total {snapshot['rerun_seconds']:.6f}",
+            "# HELP dashboard_stage_seconds Time spent in each dashboard stage.",
+            "# TYPE dashboard_stage_seconds histogram",
+        ]
+        for name, stats in snapshot["stages"].items():
+            label = _label(name)
+            for bound, count in zip(self.buckets, stats["buckets"]):
+                lines.append(f'dashboard_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {count}')
+            lines.append(f'dashboard_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'dashboard_stage_seconds_sum{{stage="{label}"}} {stats["seconds"]:.6f}')
+            lines.append(f'dashboard_stage_seconds_count{{stage="{label}"}} {stats["count"]}')
+        for metric, key, help_text in (
+            ("dashboard_stage_rows_total", "rows", "Rows processed by each dashboard stage."),
+            ("dashboard_stage_bytes_total", "bytes", "Payload bytes produced by each dashboard stage."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{stage="{_label(name)}"}} {stats[key]}' for name, stats in snapshot["stages"].items()]
+        cache = RESULT_CACHE.stats()
+        lines += [
+            "# HELP dashboard_result_cache_hits_total Result cache hits.",
+            "# TYPE dashboard_result_cache_hits_total counter",
+            f"dashboard_result_cache_hits_total {cache['hits']}",
+            "# HELP dashboard_result_cache_misses_total Result cache misses.",
+            "# TYPE dashboard_result_cache_misses_total counter",
+            f"dashboard_result_cache_misses_total {cache['misses']}",
+            "# HELP dashboard_result_cache_bytes Bytes held by the result cache.",
+            "# TYPE dashboard_result_cache_bytes gauge",
+            f"dashboard_result_cache_bytes {cache['bytes']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+# Streamlit يشغّل كل إعادة تشغيل للسكربت في خيط مستقل
+_current = threading.local()
+
+
+def start_rerun():
+    profile = RerunProfile()
+    _current.profile = profile
+    return profile
+
+
+def current():
+    return getattr(_current, "profile", None)
+
+
+@contextmanager
+def stage(name, rows=None, nbytes=None):
+    # مرحلة ضمن إعادة التشغيل الحالية؛ وخارجها (مثل توليد ملف التحميل) تُسجل مباشرة في الإحصائيات
+    profile = current()
+    if profile is not None:
+        with profile.stage(name, rows, nbytes) as record:
+            yield record
+        return
+    record = {"stage": name, "seconds": 0.0, "rows": rows, "bytes": nbytes}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        METRICS.observe(name, record["seconds"], record["rows"], record["bytes"])
+
+
+def profiled(name):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            with stage(name):
+                return func(*args)
+        return wrapper
+    return decorate
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,125 @@
+import functools
+import inspect
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# الحد الأقصى لذاكرة النتائج المشتركة بين كل الجلسات (بالميغابايت)
+RESULT_CACHE_MB = int(os.environ.get("DASHBOARD_RESULT_CACHE_MB", "256"))
+
+
+class ResultCache:
+    # ذاكرة نتائج مشتركة على مستوى العملية مع إخراج الأقدم استخدامًا (LRU) عند تجاوز الحد
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # كل عنصر: (القيمة، الحجم، توقيع نسخة البيانات التي حُسب عليها أو None)
+        self._entries = OrderedDict()
+        self.signature = None
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, signature=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        # الحساب خارج القفل حتى لا تنتظر الجلسات الأخرى
+        value = compute()
+        self.put(key, value, signature)
+        return value
+
+    def put(self, key, value, signature=None):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            # نتيجة جلسة بدأت قبل تحديث البيانات لا تُحفظ، فلا تبقى النسخة السابقة في الذاكرة
+            stale = None not in (signature, self.signature) and signature != self.signature
+            if size > self.max_bytes or stale:
+                return
+            self._entries[key] = (value, size, signature)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def retain(self, signature):
+        # بعد تحديث البيانات تُحذف النتائج المحسوبة على نسخها السابقة (فحص رخيص إن لم يتغير التوقيع)
+        with self._lock:
+            if signature == self.signature:
+                return
+            self.signature = signature
+            stale = [key for key, (_, _, version) in self._entries.items() if version not in (None, signature)]
+            for key in stale:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+RESULT_CACHE = ResultCache(RESULT_CACHE_MB * 1024 * 1024)
+
+
+def cached(name, cache=RESULT_CACHE):
+    # مثل st.cache_data: المعاملات التي تبدأ بـ "_" لا تدخل في المفتاح. المعامل الأول signature
+    # أو filter_key (أوله التوقيع) يربط النتيجة بنسخة البيانات لتُحذف عند تحديثها
+    def decorate(func):
+        params = list(inspect.signature(func).parameters)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (name,) + tuple(arg for param, arg in zip(params, args) if not param.startswith("_"))
+            return cache.get_or_compute(key, lambda: func(*args), _signature(params, args))
+        return wrapper
+    return decorate
+
+
+def _signature(params, args):
+    if params[:1] == ["signature"]:
+        return args[0]
+    if params[:1] == ["filter_key"]:
+        return args[0][0]
+    return None
+
+
+def estimate_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return 64
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
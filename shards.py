@@ -0,0 +1,51 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def available_cpus():
+    # الأنوية المسموح للعملية باستخدامها (حدود الحاوية أو taskset)، لا كل أنوية الجهاز
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# عدد الخيوط لتجميع الأجزاء الشهرية بالتوازي (1 = بدون توازٍ).
+# bincount و sum واستعلامات sqlite تُحرر قفل GIL أثناء التنفيذ، فالخيوط تكفي دون نسخ البيانات بين عمليات
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", available_cpus()))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def month_shards(first_day, last_day):
+    # أجزاء شهرية [بداية، نهاية) كأيام منذ 1970-01-01 تغطي الفترة من first_day إلى last_day
+    if last_day < first_day:
+        return []
+    first_month = np.datetime64(int(first_day), "D").astype("datetime64[M]")
+    last_month = np.datetime64(int(last_day), "D").astype("datetime64[M]")
+    bounds = np.arange(first_month, last_month + 2).astype("datetime64[D]").astype(np.int64)
+    bounds[0], bounds[-1] = first_day, last_day + 1
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def map_shards(func, shards, workers=None):
+    # تنفيذ func على كل جزء مع الحفاظ على ترتيب النتائج
+    workers = DASHBOARD_WORKERS if workers is None else workers
+    if workers <= 1 or len(shards) <= 1:
+        return [func(shard) for shard in shards]
+    if workers != DASHBOARD_WORKERS:
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(func, shards))
+    return list(_shared_pool().map(func, shards))
+
+
+def _shared_pool():
+    # مجمع خيوط واحد مشترك بين كل الجلسات حتى لا يتضاعف عدد الخيوط مع عدد المستخدمين
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(DASHBOARD_WORKERS, thread_name_prefix="shard")
+        return _pool
@@ -0,0 +1,88 @@
+import numpy as np
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+# الأعمدة المتاحة للترتيب في الجدول التفصيلي
+SORT_COLUMNS = ("التاريخ", "المنتج", "المنطقة", "الإيرادات")
+
+# عدد المواقع في كل جزء عند المرور على ترتيب الصفوف؛ الصفحات الأولى لا تمر إلا على أجزاء قليلة
+TABLE_CHUNK_ROWS = 1 << 16
+
+
+def search_masks(row_index, text):
+    # بحث نصي في أسماء المنتجات والمناطق: (أقنعة المنتجات، أقنعة المناطق) المطابقة، أو None دون بحث
+    text = text.strip()
+    if not text:
+        return None
+    products = row_index.products.astype(str).str.contains(text, regex=False)
+    regions = row_index.regions.astype(str).str.contains(text, regex=False)
+    return np.asarray(products), np.asarray(regions)
+
+
+def table_length(row_index, rows, masks):
+    # عدد صفوف الجدول؛ دون بحث هو عدد صفوف الاختيار، ومع البحث يُعد جزءًا بجزء
+    if masks is None:
+        return len(rows)
+    return sum(len(chunk) for chunk in _ordered_chunks(row_index, rows, "التاريخ", True, masks, None))
+
+
+def page_positions(row_index, rows, column, ascending, masks, page, page_size, revenue_order=None):
+    # مواقع صفوف الصفحة (تبدأ من 1) بترتيب العمود دون ترتيب كل الصفوف المفلترة: الترتيب مستقر
+    # بترتيب التاريخ ويُعكس كله تنازليًا، ويُمر على ترتيب جاهز لكل نسخة من البيانات حتى تكتمل الصفحة
+    offset = (page - 1) * page_size
+    if column == "التاريخ" and masks is None:
+        # الاختيار نفسه مرتب حسب التاريخ: الصفحة شريحة منه
+        if ascending:
+            return rows.segment(offset, offset + page_size)
+        stop = max(len(rows) - offset, 0)
+        return rows.segment(max(stop - page_size, 0), stop)[::-1]
+    parts = []
+    for chunk in _ordered_chunks(row_index, rows, column, ascending, masks, revenue_order):
+        if offset >= len(chunk):
+            offset -= len(chunk)
+            continue
+        parts.append(chunk[offset:offset + page_size])
+        page_size -= len(parts[-1])
+        offset = 0
+        if page_size == 0:
+            break
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def _ordered_chunks(row_index, rows, column, ascending, masks, revenue_order):
+    # أجزاء مواقع صفوف الجدول بالترتيب النهائي، كل جزء مفلتر بالاختيار والبحث
+    for chunk, exact in _candidate_chunks(row_index, rows, column, ascending, revenue_order):
+        keep = None if exact else rows.contains(chunk)
+        if masks is not None:
+            products, regions = masks
+            found = products[row_index.product_codes[chunk]] | regions[row_index.region_codes[chunk]]
+            keep = found if keep is None else keep & found
+        yield chunk if keep is None else chunk[keep]
+
+
+def _candidate_chunks(row_index, rows, column, ascending, revenue_order):
+    # (مواقع مرشحة، هل كلها داخل الاختيار) بترتيب العمود؛ الفئات مرتبة أبجديًا فقوائم صفوفها
+    # بترتيب أكوادها هي الترتيب، وكل قائمة مرتبة حسب التاريخ فتُقص على نطاق الاختيار
+    step = 1 if ascending else -1
+    if column == "التاريخ":
+        bounds = range(0, len(rows), TABLE_CHUNK_ROWS)
+        for start in bounds[::step]:
+            yield rows.segment(start, start + TABLE_CHUNK_ROWS)[::step], True
+    elif column in ("المنتج", "المنطقة"):
+        lists = row_index.product_rows if column == "المنتج" else row_index.region_rows
+        exact = len(rows) == rows.stop - rows.start
+        for positions in lists[::step]:
+            positions = positions[positions.searchsorted(rows.start):positions.searchsorted(rows.stop)]
+            yield from _slices(positions, step, exact)
+    else:
+        yield from _slices(revenue_order, step, False)
+
+
+def _slices(positions, step, exact):
+    bounds = range(0, len(positions), TABLE_CHUNK_ROWS)
+    for start in bounds[::step]:
+        yield positions[start:start + TABLE_CHUNK_ROWS][::step], exact
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
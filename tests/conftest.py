@@ -0,0 +1,5 @@
+import os
+import sys
+
+# وحدات اللوحة في جذر المستودع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,209 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+from backends import SQLBackend, open_backend
+from cube import DAY_ORDER
+from dataset import SalesData
+
+# نتائج pipeline على كل محرك تُقارن بـ groupby().sum() على ملف CSV كما في النسخة الأولى من اللوحة
+
+BACKENDS = ["pandas", "sqlite", "duckdb"]
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Dataset.csv")
+
+
+def open_named(path, cache_dir, name):
+    # duckdb اختياري: اختباراته تُتخطى إن لم يكن مثبتًا
+    if name == "duckdb":
+        pytest.importorskip("duckdb")
+    return open_backend(path, str(cache_dir), name)
+
+
+def sales_rows(copies, seed=0):
+    # نسخ من Dataset.csv مزاحة بالتاريخ، بترتيب عشوائي (غير مرتبة حسب التاريخ)
+    source = pd.read_csv(DATASET)
+    dates = pd.to_datetime(source["التاريخ"])
+    parts = [source.assign(**{"التاريخ": (dates + pd.Timedelta(days=5 * k)).dt.strftime("%Y-%m-%d")}) for k in range(copies)]
+    return pd.concat(parts, ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def baseline(path):
+    # الإطار كما حمّلته النسخة الأولى: تواريخ وأسماء أيام الأسبوع، والإيرادات كما في الملف
+    df = pd.read_csv(path)
+    df["التاريخ"] = pd.to_datetime(df["التاريخ"])
+    df["يوم_الأسبوع"] = df["التاريخ"].dt.dayofweek.map(dict(enumerate(DAY_ORDER)))
+    return df
+
+
+def grouped(df, *dims):
+    return df.groupby(list(dims))["الإيرادات"].sum()
+
+
+def normalized(result):
+    # المفاتيح كنصوص (التواريخ كما هي) مرتبة، فلا يدخل ترتيب الفئات أو نوع الفهرس في المقارنة
+    frame = result.reset_index() if isinstance(result, pd.Series) else result.reset_index(drop=True)
+    keys = [column for column in frame.columns if column != "الإيرادات"]
+    for key in keys:
+        if not pd.api.types.is_datetime64_any_dtype(frame[key]):
+            frame[key] = frame[key].astype(str)
+    return frame.sort_values(keys).reset_index(drop=True)[keys + ["الإيرادات"]]
+
+
+def assert_same(actual, expected):
+    pd.testing.assert_frame_equal(normalized(actual), normalized(expected), check_dtype=False)
+
+
+def check_filters(view, raw, products, regions, start, end):
+    filtered = raw[
+        raw["المنتج"].isin(products) & raw["المنطقة"].isin(regions)
+        & (raw["التاريخ"] >= start) & (raw["التاريخ"] <= end)
+    ]
+    selection = pipeline.filter_rows(view, products, regions, start, end)
+    assert len(selection) == len(filtered)
+
+    total, by_day, by_product, by_region = pipeline.kpis(selection)
+    assert total == pytest.approx(filtered["الإيرادات"].sum())
+    assert_same(by_day, grouped(filtered, "يوم_الأسبوع"))
+    assert_same(by_product, grouped(filtered, "المنتج"))
+    assert_same(by_region, grouped(filtered, "المنطقة"))
+    assert_same(selection.sum_by("التاريخ"), grouped(filtered, "التاريخ"))
+
+    # تبويبات المقارنة
+    assert_same(pipeline.product_region_frame(selection), grouped(filtered, "المنتج", "المنطقة").reset_index())
+    assert_same(pipeline.region_product_frame(selection), grouped(filtered, "المنطقة", "المنتج").reset_index())
+    assert_same(pipeline.product_day_frame(selection), grouped(filtered, "المنتج", "يوم_الأسبوع").reset_index())
+    assert_same(pipeline.region_day_frame(selection), grouped(filtered, "المنطقة", "يوم_الأسبوع").reset_index())
+
+    # تحليل تأثير الأيام لأول منتج ومنطقة في الصفوف المفلترة
+    if len(filtered):
+        product, region = filtered["المنتج"].iloc[0], filtered["المنطقة"].iloc[0]
+        pair = filtered[(filtered["المنتج"] == product) & (filtered["المنطقة"] == region)]
+        analysis_df = pipeline.day_impact_frame(view, product, region, start, end)
+        assert_same(analysis_df, grouped(pair, "يوم_الأسبوع").reset_index())
+        assert list(analysis_df["يوم_الأسبوع"].astype(str)) == [day for day in DAY_ORDER if day in set(pair["يوم_الأسبوع"])]
+
+
+def random_filters(raw, rng):
+    products = raw["المنتج"].unique()
+    regions = raw["المنطقة"].unique()
+    dates = np.sort(raw["التاريخ"].unique())
+    start, end = sorted(rng.choice(dates, 2))
+    return (
+        list(rng.choice(products, rng.integers(0, len(products) + 1), replace=False)),
+        list(rng.choice(regions, rng.integers(0, len(regions) + 1), replace=False)),
+        pd.Timestamp(start),
+        pd.Timestamp(end),
+    )
+
+
+def check_view(view, raw, rng, trials=10):
+    products, regions, start, end = pipeline.default_filters(view)
+    # خيارات الفلاتر بترتيب أول ظهور في الملف كما في unique()
+    assert products == list(raw["المنتج"].unique())
+    assert regions == list(raw["المنطقة"].unique())
+    assert (start, end) == (raw["التاريخ"].min(), raw["التاريخ"].max())
+    check_filters(view, raw, products, regions, start, end)
+    for _ in range(trials):
+        check_filters(view, raw, *random_filters(raw, rng))
+
+
+@pytest.fixture(scope="module")
+def sales_path(tmp_path_factory):
+    rows = sales_rows(8)
+    # إيرادات فارغة تُتجاهل في المجاميع كما في groupby().sum()
+    rows.loc[[3, 50, 400], "الإيرادات"] = np.nan
+    path = str(tmp_path_factory.mktemp("sales") / "sales.csv")
+    rows.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_pipeline_matches_groupby(tmp_path, sales_path, name):
+    view = open_named(sales_path, tmp_path / "cache", name).refresh()
+    check_view(view, baseline(sales_path), np.random.default_rng(0), trials=25)
+
+
+@pytest.mark.parametrize("name", BACKENDS[1:])
+def test_table_pages_match_pandas(tmp_path, sales_path, name):
+    # صفحات الجدول في محركات SQL مطابقة للجدول في الذاكرة، ومنها الإيرادات الفارغة عند الترتيب بالإيرادات
+    expected = open_backend(sales_path, str(tmp_path / "pandas"), "pandas").refresh()
+    view = open_named(sales_path, tmp_path / name, name).refresh()
+    products, regions, start, end = pipeline.default_filters(view)
+    # كل الصفوف، ثم جزء من الفئات والفترة مع بحث نصي
+    subset = (products[::2], regions[1:], start + pd.Timedelta(days=10), end - pd.Timedelta(days=10))
+    for filters, search_text in [((products, regions, start, end), ""), (subset, products[0])]:
+        for column in ["التاريخ", "المنتج", "المنطقة", "الإيرادات"]:
+            for ascending in [True, False]:
+                table = view.select(*filters).table(search_text, column, ascending)
+                pandas_table = expected.select(*filters).table(search_text, column, ascending)
+                assert len(table) == len(pandas_table)
+                for page in range(1, len(table) // 100 + 2):
+                    pd.testing.assert_frame_equal(
+                        table.page(page, 100), pandas_table.page(page, 100), check_index_type=False
+                    )
+
+
+def spy(monkeypatch, cls, name):
+    # يسجل استدعاءات دالة دون تغيير سلوكها
+    calls = []
+    original = getattr(cls, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args[1:])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cls, name, wrapper)
+    return calls
+
+
+def append_rows(case, rows):
+    # صفوف تُلحق بنهاية الملف في كل حالة؛ in_order بتواريخ لا تسبق آخر تاريخ وبالفئات نفسها
+    added = sales_rows(1, seed=1).iloc[:60].copy()
+    last = pd.to_datetime(rows["التاريخ"]).max()
+    if case == "out_of_order":
+        # تواريخ تسبق آخر تاريخ محمّل
+        added["التاريخ"] = (last - pd.to_timedelta(np.arange(len(added)) % 20, unit="D")).strftime("%Y-%m-%d")
+    else:
+        added["التاريخ"] = (last + pd.to_timedelta(np.arange(len(added)) % 10, unit="D")).strftime("%Y-%m-%d")
+    if case == "new_category":
+        added.iloc[::7, added.columns.get_loc("المنتج")] = "منتج جديد"
+        added.iloc[::5, added.columns.get_loc("المنطقة")] = "منطقة جديدة"
+    if case == "revenue_widening":
+        # قيمة صحيحة لا يسعها النوع المصغّر الحالي
+        added.iloc[0, added.columns.get_loc("الإيرادات")] = 10 ** 10
+    if case == "revenue_float":
+        added["الإيرادات"] = added["الإيرادات"].astype(float)
+        added.iloc[1, added.columns.get_loc("الإيرادات")] = 2.5
+    return added
+
+
+@pytest.mark.parametrize("case", ["in_order", "new_category", "out_of_order", "revenue_widening", "revenue_float"])
+@pytest.mark.parametrize("name", BACKENDS)
+def test_append_matches_groupby(tmp_path, monkeypatch, name, case):
+    rows = sales_rows(4).sort_values("التاريخ", kind="stable")
+    path = str(tmp_path / "sales.csv")
+    rows.to_csv(path, index=False)
+    backend = open_named(path, tmp_path / "cache", name)
+    rng = np.random.default_rng(1)
+    view = backend.refresh()
+    signature = view.signature
+    check_view(view, baseline(path), rng)
+
+    appends = spy(monkeypatch, SalesData, "_append")
+    builds = spy(monkeypatch, SalesData, "_build")
+    rebuilds = spy(monkeypatch, SQLBackend, "_rebuild")
+    append_rows(case, rows).to_csv(path, mode="a", header=False, index=False)
+    view = backend.refresh()
+    assert view.signature != signature
+    # الصفوف الملحقة تُضاف إلى البيانات الحالية دون إعادة بنائها؛ قاعدة SQL لا تشترط ترتيب التواريخ
+    # وتخزن كل الإيرادات الصحيحة بـ BIGINT
+    if name == "pandas":
+        incremental = case == "in_order"
+        assert (len(appends), len(builds)) == ((1, 0) if incremental else (0, 1))
+    else:
+        incremental = case in ("in_order", "out_of_order", "revenue_widening")
+        assert len(rebuilds) == (0 if incremental else 1)
+    check_view(view, baseline(path), rng)
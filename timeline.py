@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from codes import day_number, day_numbers, label_codes
+from downsample import ROLLUPS
+
+# مؤشرات الفترة المتاحة في صف المؤشرات، وطول نوافذها بالأيام
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+PERIOD_KPIS = ("المتوسط اليومي (7 أيام)", "التغير الأسبوعي", "التغير الشهري", "الإجمالي التراكمي")
+
+# إضافات رسم الإيرادات بمرور الوقت، وعدد الفترات في المتوسط المتحرك لكل تجميع زمني
+OVERLAYS = ("المتوسط المتحرك", "الإجمالي التراكمي")
+MOVING_PERIODS = {"يومي": 7, "أسبوعي": 4, "شهري": 3}
+
+
+class RevenueTimeline:
+    # مجاميع تراكمية للإيرادات لكل (منتج، منطقة) على محور أيام متصل من أول تاريخ إلى آخره.
+    # مجموع أي فترة فرق قيمتين، فالمتوسطات المتحركة والمقارنة بين فترتين لا تمر على الصفوف
+
+    def __init__(self, products, regions, first_day, daily):
+        # daily: الإيرادات اليومية (منتج × منطقة × يوم)، first_day: أول يوم كعدد أيام منذ 1970-01-01
+        self.products = pd.Index(products)
+        self.regions = pd.Index(regions)
+        self.first_day = first_day
+        self.prefix = np.zeros(daily.shape[:2] + (daily.shape[2] + 1,), dtype=daily.dtype)
+        np.cumsum(daily, axis=2, out=self.prefix[..., 1:])
+        # المجاميع الهامشية تغني عن جمع الخلايا عند اختيار كل المناطق أو كل المنتجات
+        self.by_product = self.prefix.sum(axis=1)
+        self.by_region = self.prefix.sum(axis=0)
+        self.total = self.by_product.sum(axis=0)
+
+    @classmethod
+    def from_cube(cls, cube):
+        days = day_numbers(cube.dates)
+        first_day, span = _span(days)
+        daily = np.zeros(cube.revenue.shape[:2] + (span,), dtype=cube.revenue.dtype)
+        daily[..., days - (first_day or 0)] = cube.revenue
+        return cls(cube.products, cube.regions, first_day, daily)
+
+    @classmethod
+    def from_records(cls, products, regions, product_codes, region_codes, days, values):
+        # مجاميع (منتج، منطقة، يوم) كما يعيدها GROUP BY، كل مفتاح مرة واحدة
+        days = np.asarray(days, dtype=np.int64)
+        values = np.asarray(values)
+        first_day, span = _span(days)
+        daily = np.zeros((len(products), len(regions), span), dtype=np.result_type(values.dtype, np.int64))
+        daily[np.asarray(product_codes, dtype=np.int64), np.asarray(region_codes, dtype=np.int64), days - (first_day or 0)] = values
+        return cls(products, regions, first_day, daily)
+
+    @property
+    def nbytes(self):
+        return self.prefix.nbytes + self.by_product.nbytes + self.by_region.nbytes + self.total.nbytes
+
+    def select(self, products, regions):
+        p_idx = label_codes(self.products, products)
+        r_idx = label_codes(self.regions, regions)
+        if len(p_idx) == len(self.products) and len(r_idx) == len(self.regions):
+            prefix = self.total
+        elif len(r_idx) == len(self.regions):
+            prefix = self.by_product[p_idx].sum(axis=0)
+        elif len(p_idx) == len(self.products):
+            prefix = self.by_region[r_idx].sum(axis=0)
+        else:
+            prefix = self.prefix[np.ix_(p_idx, r_idx)].sum(axis=(0, 1))
+        return TimelineSelection(self.first_day, prefix)
+
+
+class TimelineSelection:
+    # المجموع التراكمي اليومي للمنتجات والمناطق المختارة؛ كل استعلام فترة بتكلفة ثابتة
+
+    def __init__(self, first_day, prefix):
+        self.first_day = first_day
+        self.prefix = prefix
+
+    @property
+    def nbytes(self):
+        return self.prefix.nbytes
+
+    def range_sum(self, start, end):
+        # مجموع الإيرادات من start إلى end (شاملة) كما في فلتر الفترة
+        start_day = day_number(pd.Timestamp(start).ceil("D"))
+        return self._through(day_number(pd.Timestamp(end).floor("D"))) - self._through(start_day - 1)
+
+    def window(self, end, days):
+        # مجموع آخر days يومًا حتى end، ومجموع الأيام نفسها قبلها
+        last = day_number(pd.Timestamp(end).floor("D"))
+        current = self._through(last) - self._through(last - days)
+        previous = self._through(last - days) - self._through(last - 2 * days)
+        return current, previous
+
+    def change(self, end, days):
+        # (مجموع النافذة الحالية، نسبة التغير عن السابقة أو None إن لم توجد إيرادات سابقة)
+        current, previous = self.window(end, days)
+        return current, ((current - previous) / previous * 100 if previous else None)
+
+    def moving_average(self, end, days):
+        # متوسط الإيراد اليومي في آخر days يومًا (الأيام قبل بداية البيانات لا تُحسب)
+        last = day_number(pd.Timestamp(end).floor("D"))
+        if self.first_day is None or last < self.first_day:
+            return 0
+        days = min(days, last - self.first_day + 1)
+        return self.window(end, days)[0] / days
+
+    def cumulative(self, end):
+        # الإيرادات منذ بداية البيانات حتى end
+        return self._through(day_number(pd.Timestamp(end).floor("D")))
+
+    def rolling(self, dates, rollup_name, start, end):
+        # لكل نقطة في الرسم: المتوسط المتحرك لآخر فترات التجميع (يومًا أو أسبوعًا أو شهرًا)
+        # حتى فترتها، والإجمالي التراكمي من بداية فلتر الفترة حتى نهايتها
+        periods = pd.DatetimeIndex(dates).to_period(ROLLUPS[rollup_name] or "D")
+        count = MOVING_PERIODS[rollup_name]
+        period_end = day_numbers(periods.end_time.floor("D"))
+        window_start = day_numbers((periods - (count - 1)).start_time)
+        moving = self._through(period_end) - self._through(window_start - 1)
+        if self.first_day is not None:
+            # عند بداية البيانات يُقسم على الفترات الموجودة فقط
+            first = pd.Timestamp(self.first_day, unit="D").to_period(periods.freq)
+            count = np.clip(periods.asi8 - first.ordinal + 1, 1, count)
+        last = day_number(pd.Timestamp(end).floor("D"))
+        start_day = day_number(pd.Timestamp(start).ceil("D"))
+        cumulative = self._through(np.minimum(period_end, last)) - self._through(start_day - 1)
+        return moving / count, cumulative
+
+    def _through(self, day):
+        # المجموع التراكمي حتى نهاية day (عدد أيام منذ 1970-01-01، قيمة أو مصفوفة)
+        if self.first_day is None:
+            return np.zeros_like(day, dtype=self.prefix.dtype)[()]
+        position = np.clip(np.asarray(day) - self.first_day + 1, 0, len(self.prefix) - 1)
+        return self.prefix[position]
+
+
+def _span(days):
+    if len(days) == 0:
+        return None, 0
+    first_day = int(days.min())
+    return first_day, int(days.max()) - first_day + 1
@@ -0,0 +1,105 @@
+import argparse
+import importlib
+import json
+import runpy
+import sys
+import threading
+import time
+
+# تسخين عامل جديد قبل وصول الزيارات: استيراد المكتبات الثقيلة، ثم تشغيل اللوحة مرة دون خادم
+# بالفلاتر الافتراضية فيُبنى مخزن الأعمدة على القرص (إن لم يوجد) وتُحفظ البيانات والتجميعات والرسوم
+# في ذاكرة العملية، مع تقرير بزمن كل مرحلة. مع --serve يبدأ خادم Streamlit في العملية نفسها
+# فيخدم أول زائر اللوحة الافتراضية من الذاكرة مباشرة. مع --api-port تعمل واجهة JSON (api.py)
+# في العملية نفسها فتتشارك مع اللوحة البيانات والنتائج المحفوظة:
+#
+#     python warmup.py --serve --api-port 8600 -- --server.port 8501
+
+APP_SCRIPT = "app.py"
+HEAVY_MODULES = ("numpy", "pandas", "pyarrow", "plotly.express", "streamlit")
+
+
+def import_modules(modules=HEAVY_MODULES):
+    # زمن استيراد كل مكتبة بالترتيب (المكتبات الاختيارية غير المثبتة تُتجاوز)
+    report = []
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        report.append({"stage": f"import:{name}", "seconds": time.perf_counter() - start})
+    return report
+
+
+def render(script=APP_SCRIPT):
+    # تشغيل واحد للوحة دون خادم؛ يعيد الزمن الكلي ومراحل إعادة التشغيل كما سجلتها profiling
+    from streamlit import config, logger
+
+    # كل عنصر يطبع تحذير "missing ScriptRunContext" عند التشغيل دون خادم. قراءة الإعدادات أولًا
+    # لأن Streamlit يعيد ضبط مستوى السجل عند تحميلها
+    level = config.get_option("logger.level")
+    logger.set_log_level("error")
+    try:
+        start = time.perf_counter()
+        namespace = runpy.run_path(script, run_name="__main__")
+        seconds = time.perf_counter() - start
+    finally:
+        logger.set_log_level(level)
+    return seconds, namespace["profile"].stages
+
+
+def warm_up(script=APP_SCRIPT):
+    # تقرير بدء التشغيل: الاستيراد، ثم التشغيل الأول (تحميل وحساب)، ثم الثاني (من الذاكرة)
+    started = time.perf_counter()
+    report = import_modules()
+    from profiling import METRICS
+    from result_cache import RESULT_CACHE
+
+    for record in report:
+        METRICS.observe("startup:" + record["stage"], record["seconds"])
+    for name in ("cold", "warm"):
+        seconds, stages = render(script)
+        METRICS.observe(f"startup:render:{name}", seconds)
+        report.append({"stage": f"render:{name}", "seconds": seconds, "stages": stages})
+    return {"seconds": time.perf_counter() - started, "stages": report, "result_cache": RESULT_CACHE.stats()}
+
+
+def print_report(report):
+    print("زمن بدء التشغيل")
+    for record in report["stages"]:
+        print(f"{record['stage']:<28} {record['seconds'] * 1000:10.1f} ms")
+        for stage in record.get("stages", ()):
+            print(f"    {stage['stage']:<40} {stage['seconds'] * 1000:10.1f} ms")
+    cache = report["result_cache"]
+    print(f"{'المجموع':<28} {report['seconds'] * 1000:10.1f} ms")
+    print(f"ذاكرة النتائج: {cache['entries']:,} عنصر · {cache['bytes'] / 2**20:,.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تسخين لوحة المبيعات قبل وصول الزيارات وتقرير زمن بدء التشغيل")
+    parser.add_argument("--script", default=APP_SCRIPT)
+    parser.add_argument("--output", help="ملف JSON لحفظ التقرير")
+    parser.add_argument("--serve", action="store_true", help="تشغيل خادم Streamlit في العملية نفسها بعد التسخين")
+    parser.add_argument("--api-port", type=int, help="تشغيل واجهة JSON على هذا المنفذ مع --serve")
+    parser.add_argument("streamlit_args", nargs="*", help="خيارات تُمرر إلى streamlit run (بعد --)")
+    args = parser.parse_args()
+
+    report = warm_up(args.script)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+    if args.serve:
+        from streamlit.web import cli
+
+        if args.api_port:
+            import api
+
+            threading.Thread(target=api.make_server(port=args.api_port).serve_forever, daemon=True).start()
+
+        sys.argv = ["streamlit", "run", args.script, *args.streamlit_args]
+        sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()